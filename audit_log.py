@@ -0,0 +1,104 @@
+import os
+import json
+import math
+import atexit
+import threading
+from datetime import datetime, timezone
+
+def _value(v):
+    """Audit representation of a cell: None for blanks, otherwise text."""
+    if v is None or (isinstance(v, float) and math.isnan(v)): return None
+    try:
+        if v != v: return None  # pd.NA / NaT
+    except (TypeError, ValueError): pass
+    return str(v)
+
+def field_changes(old_row, new_row):
+    """[(field, old, new)] for every field in new_row whose value differs from old_row."""
+    out = []
+    for field, new in new_row.items():
+        if field == 'id': continue
+        old_v, new_v = _value(old_row.get(field)) if old_row else None, _value(new)
+        if old_v != new_v: out.append((field, old_v, new_v))
+    return out
+
+class AuditLog:
+    """
+    Buffered audit trail. record() only appends to memory; a background thread writes batches.
+    1. A batch is flushed once max_batch events are waiting or every flush_interval seconds.
+    2. If the write fails, the batch is appended to a JSONL spill file and replayed (first) on the next flush.
+    3. Whatever is still buffered is flushed at interpreter exit.
+    """
+    def __init__(self, write_rows, spill_path, max_batch=200, flush_interval=5):
+        self.write_rows = write_rows      # list of row dicts -> None (raises on failure)
+        self.spill_path = spill_path
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._pid = None
+        os.makedirs(os.path.dirname(spill_path) or ".", exist_ok=True)
+
+    # --- RECORDING (never blocks on the backend) ---
+    def record(self, event, user=None, table=None, row_id=None, complex_name=None, field=None, old=None, new=None):
+        row = {"created_at": datetime.now(timezone.utc).isoformat(), "event": event, "user_email": user, "table_name": table,
+               "row_id": _value(row_id), "complex_name": _value(complex_name), "field": field, "old_value": old, "new_value": new}
+        with self._lock:
+            self._buffer.append(row)
+            full = len(self._buffer) >= self.max_batch
+        if full: self._wake.set()
+
+    def record_changes(self, table, old_rows, new_rows, user=None):
+        """One event per changed field. old_rows: {id: row dict} as it was before the save (may be incomplete)."""
+        for new_row in new_rows:
+            rid = new_row.get('id')
+            old_row = old_rows.get(rid)
+            complex_name = new_row.get('Complex Name') or (old_row or {}).get('Complex Name')
+            for field, old, new in field_changes(old_row, new_row):
+                self.record("update", user, table, rid, complex_name, field, old, new)
+
+    # --- FLUSHING ---
+    def _spill(self, rows):
+        with open(self.spill_path, "a", encoding="utf-8") as f:
+            for r in rows: f.write(json.dumps(r) + "\n")
+
+    def _replay_spill(self):
+        """Writes spilled rows back to the backend; returns False (re-spilling what's left) if it is still down."""
+        # Claim the file first so another process (app / worker) appending to it doesn't lose rows.
+        claimed = f"{self.spill_path}.{os.getpid()}"
+        try: os.replace(self.spill_path, claimed)
+        except FileNotFoundError: return True
+        with open(claimed, encoding="utf-8") as f: rows = [json.loads(line) for line in f if line.strip()]
+        os.remove(claimed)
+        for i in range(0, len(rows), self.max_batch):
+            try: self.write_rows(rows[i:i + self.max_batch])
+            except Exception: self._spill(rows[i:]); return False
+        return True
+
+    def flush(self):
+        """Writes everything buffered (after any spilled rows). Safe to call from any thread."""
+        with self._flush_lock:
+            with self._lock: rows, self._buffer = self._buffer, []
+            if not self._replay_spill():
+                if rows: self._spill(rows)
+                return
+            for i in range(0, len(rows), self.max_batch):
+                batch = rows[i:i + self.max_batch]
+                try: self.write_rows(batch)
+                except Exception: self._spill(rows[i:]); return
+
+    def start(self):
+        """Starts the background flusher (once per process; a forked worker process calls it again)."""
+        if self._thread is not None and self._pid == os.getpid(): return
+        self._pid = os.getpid()
+        def loop():
+            while True:
+                self._wake.wait(self.flush_interval); self._wake.clear()
+                try: self.flush()
+                except Exception: pass
+        self._thread = threading.Thread(target=loop, name="takeon-audit", daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
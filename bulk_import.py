@@ -0,0 +1,97 @@
+import re
+import pandas as pd
+from utils import EMAIL_PATTERN, PHONE_PATTERN, PHONE_STRIP, SA_ID_PATTERN
+
+# Target column -> (check, header aliases).
+# Checks: "required", "money" (R 1 234,50 -> 1234.5), "email", "phone", "sa_id", None (free text).
+IMPORT_SPECS = {
+    "Employees": {
+        "Name": ("required", ["name", "first name", "firstname", "employee name"]),
+        "Surname": (None, ["surname", "last name", "lastname"]),
+        "ID Number": ("sa_id", ["id number", "id", "id no", "identity number", "sa id"]),
+        "Position": (None, ["position", "job title", "title", "role"]),
+        "Salary": ("money", ["salary", "wage", "monthly salary", "gross"]),
+    },
+    "Arrears": {
+        "Unit Number": ("required", ["unit number", "unit", "unit no", "door number"]),
+        "Outstanding Amount": ("money", ["outstanding amount", "amount", "balance", "arrears", "outstanding"]),
+        "Attorney Name": (None, ["attorney name", "attorney", "attorneys"]),
+        "Attorney Email": ("email", ["attorney email", "email", "e-mail"]),
+        "Attorney Phone": ("phone", ["attorney phone", "phone", "tel", "contact number", "cell"]),
+    },
+    "Council": {
+        "Account Number": ("required", ["account number", "account", "acc", "account no"]),
+        "Service": (None, ["service", "services", "description", "type"]),
+        "Balance": ("money", ["balance", "amount", "outstanding"]),
+    },
+}
+# Column that must be unique within one file (blank values are not compared).
+DUPLICATE_KEYS = {"Employees": "ID Number", "Arrears": "Unit Number", "Council": "Account Number"}
+# Columns the single-row add_* functions also set.
+DEFAULTS = {"Employees": {"Payslip Received": False, "Contract Received": False, "Tax Ref Received": False},
+            "Arrears": {}, "Council": {}}
+ERROR_MESSAGES = {"required": "Required", "money": "Not an amount", "email": "Invalid email",
+                  "phone": "Invalid phone (10 digits)", "sa_id": "Invalid ID number (13 digits)"}
+
+def _norm(header):
+    return re.sub(r'[^a-z0-9]+', ' ', str(header).lower()).strip()
+
+def read_file(file):
+    """
+    CSV or Excel upload as text columns (keeps leading zeros in IDs and phone numbers).
+    Blank rows are dropped but the index is kept, so index + 2 is still the spreadsheet row.
+    """
+    name = getattr(file, "name", str(file)).lower()
+    if name.endswith(".xlsx"): df = pd.read_excel(file, dtype=str)  # openpyxl; legacy .xls would need xlrd.
+    else: df = pd.read_csv(file, dtype=str, sep=None, engine="python", encoding="utf-8-sig", skip_blank_lines=False)
+    df.columns = [str(c).strip() for c in df.columns]
+    return df.dropna(how="all")
+
+def guess_mapping(columns, table_name):
+    """Target column -> uploaded column (or None), matching headers against the aliases."""
+    by_norm = {_norm(c): c for c in columns}
+    mapping = {}
+    for target, (_, aliases) in IMPORT_SPECS[table_name].items():
+        mapping[target] = next((by_norm[a] for a in [_norm(target)] + aliases if a in by_norm and by_norm[a] not in mapping.values()), None)
+    return mapping
+
+def _money(col):
+    # "R 1 234,50" / "1,234.50" / "(500)": a comma before exactly two final digits is the decimal mark.
+    cleaned = (col.str.replace(r'[Rr\s]', '', regex=True).str.replace(r',(\d{2})$', r'.\1', regex=True)
+               .str.replace(',', '', regex=False).str.replace(r'^\((.*)\)$', r'-\1', regex=True))
+    return pd.to_numeric(cleaned.where(cleaned != '', '0'), errors='coerce')
+
+def validate(df, mapping, table_name):
+    """
+    Checks whole columns at once. Returns (valid, errors):
+    valid is the mapped rows that passed every check; errors has one line per failed cell
+    (Row is the spreadsheet row, counting the header as row 1).
+    """
+    spec = IMPORT_SPECS[table_name]
+    out = pd.DataFrame(index=df.index)
+    bad = []
+    for target, (check, _) in spec.items():
+        src = mapping.get(target)
+        col = df[src].fillna('').astype(str).str.strip() if src else pd.Series('', index=df.index)
+        filled = col != ''
+        if check == "required": fail = ~filled
+        elif check == "email": fail = filled & ~col.str.match(EMAIL_PATTERN)
+        elif check == "phone": fail = filled & ~col.str.replace(PHONE_STRIP, '', regex=True).str.match(PHONE_PATTERN)
+        elif check == "sa_id": fail = filled & ~col.str.match(SA_ID_PATTERN)
+        elif check == "money":
+            amounts = _money(col); fail = amounts.isna(); col = amounts.fillna(0.0)
+        else: fail = pd.Series(False, index=df.index)
+        out[target] = col
+        if fail.any():
+            bad.append(pd.DataFrame({"Row": df.index[fail] + 2, "Column": target, "Value": df.loc[fail, src] if src else '', "Error": ERROR_MESSAGES[check]}))
+    key = DUPLICATE_KEYS[table_name]
+    dupes = out[key].ne('') & out[key].duplicated(keep='first')
+    if dupes.any():
+        bad.append(pd.DataFrame({"Row": df.index[dupes] + 2, "Column": key, "Value": out.loc[dupes, key], "Error": "Duplicate in file"}))
+    errors = pd.concat(bad, ignore_index=True).sort_values(["Row", "Column"]) if bad else pd.DataFrame(columns=["Row", "Column", "Value", "Error"])
+    valid = out[~out.index.isin(errors["Row"] - 2)]
+    return valid, errors.reset_index(drop=True)
+
+def to_records(valid, complex_name, table_name):
+    """Insert payloads for database.bulk_insert."""
+    return valid.assign(**{"Complex Name": complex_name}, **DEFAULTS[table_name]).to_dict("records")
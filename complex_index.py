@@ -0,0 +1,58 @@
+import time
+import pandas as pd
+
+COMPLEX_KEYS = ("Complex Name", "complex_name")
+
+class ComplexIndex:
+    """
+    A loaded table plus a complex name -> row positions index.
+    Built once per load so a building's rows are a dict lookup instead of a full-table mask.
+    """
+    def __init__(self, df, key_cols=COMPLEX_KEYS):
+        self.df = df.reset_index(drop=True)
+        self.key = next((c for c in self.df.columns if str(c).strip() in key_cols), None)
+        self.loaded_at = time.time()
+        self._build()
+
+    def _build(self):
+        if self.key is None or self.df.empty:
+            self.positions = {}
+        else:
+            self.positions = self.df.groupby(self.key, sort=False, observed=True).indices
+        self._id_pos = None
+
+    def age(self):
+        return time.time() - self.loaded_at
+
+    def rows(self, complex_name):
+        """Returns a copy of one complex's rows (empty frame with the same columns if none)."""
+        pos = self.positions.get(complex_name)
+        if pos is None: return self.df.iloc[0:0].copy()
+        return self.df.iloc[pos].copy()
+
+    def rows_by_id(self, ids):
+        """Returns the rows with the given ids (after apply_updates, for re-indexing)."""
+        if 'id' not in self.df.columns: return self.df.iloc[0:0]
+        return self.df[self.df['id'].isin(list(ids))]
+
+    def apply_updates(self, records):
+        """
+        Patches rows in place by 'id' so the index stays current after a save.
+        Returns False if a record can't be placed (caller should drop the index and reload).
+        """
+        if 'id' not in self.df.columns: return False
+        if self._id_pos is None:
+            self._id_pos = {rid: i for i, rid in enumerate(self.df['id'].tolist())}
+        rekey = False
+        for rec in records:
+            pos = self._id_pos.get(rec.get('id'))
+            if pos is None: return False
+            for k, v in rec.items():
+                if k == 'id': continue
+                col = self.df[k] if k in self.df.columns else None
+                if col is not None and isinstance(col.dtype, pd.CategoricalDtype) and pd.notna(v) and v not in col.cat.categories:
+                    self.df[k] = col.cat.add_categories([v])
+                self.df.loc[pos, k] = v
+                if k == self.key: rekey = True
+        if rekey: self._build()
+        return True
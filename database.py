@@ -1,8 +1,19 @@
 import os
+import sys
+import time
+import threading
+import subprocess
+import numpy as np
 import pandas as pd
 import streamlit as st
 from supabase import create_client, Client
 from datetime import datetime
+from local_replica import LocalReplica
+from complex_index import ComplexIndex
+from shared_cache import connect as connect_shared_cache
+from search_index import SearchIndex
+from job_queue import JobQueue
+from audit_log import AuditLog
 
 # --- INITIALIZE SUPABASE ---
 try:
@@ -26,6 +37,104 @@ except Exception as e:
     st.error(f"Connection Error: {e}")
     st.stop()
 
+def get_setting(name, default=None):
+    """Reads an optional setting from Streamlit secrets, falling back to the environment."""
+    try:
+        if name in st.secrets: return st.secrets[name]
+    except (FileNotFoundError, KeyError):
+        pass
+    return os.environ.get(name, default)
+
+# --- SHARED CACHE (multi-replica deployments) ---
+# TAKEON_SHARED_CACHE_URL: redis://host:6379/0 (or memory:// for the in-process stand-in). Unset = disabled.
+shared_cache = None
+shared_cache_url = get_setting("TAKEON_SHARED_CACHE_URL")
+if shared_cache_url:
+    try: shared_cache = connect_shared_cache(shared_cache_url, ttl=int(get_setting("TAKEON_SHARED_CACHE_TTL_SECONDS", 300)))
+    except Exception as e: print(f"Shared cache disabled: {e}")
+
+def _publish_write(table_name):
+    if shared_cache is not None: shared_cache.invalidate(table_name)
+
+# --- LOCAL REPLICA (Master / Settings / Projects) ---
+def _fetch_rows(table_name, version=None):
+    """
+    All rows of a table, through the shared cache when there is one. version is the replica's probe: it is part of the
+    cache key, so a change made outside the app's write helpers (which never bumps the cache) isn't answered with the old rows.
+    """
+    loader = lambda: supabase.table(table_name).select("*").execute().data or []
+    query = "select=*" if version is None else f"select=*;probe={version}"
+    return shared_cache.fetch(table_name, query, loader) if shared_cache is not None else loader()
+
+def _probe_version(table_name):
+    """Row count + latest updated_at (migrations/005), so in-place updates change it too. Count + max id without it."""
+    try:
+        res = supabase.table(table_name).select("updated_at", count="exact").order("updated_at", desc=True).limit(1).execute()
+        return f"{res.count}:{res.data[0]['updated_at'] if res.data else None}"
+    except Exception:
+        res = supabase.table(table_name).select("id", count="exact").order("id", desc=True).limit(1).execute()
+        top_id = res.data[0]["id"] if res.data else None
+        return f"{res.count}:{top_id}"
+
+cache_dir = get_setting("TAKEON_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "pretor-takeon"))
+try:
+    replica = LocalReplica(cache_dir, _fetch_rows, _probe_version,
+                           refresh_interval=int(get_setting("TAKEON_REPLICA_REFRESH_SECONDS", 60)))
+    replica.start()
+except Exception as e:
+    print(f"Local replica disabled: {e}")
+    replica = None
+
+# --- JOB QUEUE (long-running work, executed by worker.py) ---
+# TAKEON_JOB_DB must point at the same file for the app and its workers (default: inside TAKEON_CACHE_DIR).
+jobs = JobQueue(get_setting("TAKEON_JOB_DB", os.path.join(cache_dir, "jobs.sqlite3")))
+
+# A plain `streamlit run app.py` deploy has no worker: the app starts one (TAKEON_START_WORKER=0 if workers are run separately).
+start_worker = str(get_setting("TAKEON_START_WORKER", "1")).lower() not in ("0", "false", "no")
+_worker_proc = None
+_worker_lock = threading.Lock()
+
+def ensure_worker():
+    """Starts `python worker.py` beside the app unless a worker is already polling the queue or running a job."""
+    global _worker_proc
+    if not start_worker: return
+    with _worker_lock:
+        if _worker_proc is not None and _worker_proc.poll() is None: return
+        if jobs.workers_alive(): return
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "worker.py")
+        try: _worker_proc = subprocess.Popen([sys.executable, script, "--parent", str(os.getpid())])
+        except OSError as e: print(f"Could not start worker: {e}")
+
+def submit_job(kind, payload=None, data=None):
+    """Queues a job for worker.py (starting one if none is running) and returns its id."""
+    job_id = jobs.submit(kind, payload, data)
+    ensure_worker()
+    return job_id
+
+def get_job(job_id):
+    return jobs.get(job_id)
+
+# --- AUDIT LOG (buffered; flushed to the AuditLog table in the background) ---
+def _write_audit_rows(rows):
+    supabase.table("AuditLog").insert(rows).execute()
+
+audit = AuditLog(_write_audit_rows, os.path.join(cache_dir, "audit_spill.jsonl"),
+                 max_batch=int(get_setting("TAKEON_AUDIT_BATCH", 200)), flush_interval=float(get_setting("TAKEON_AUDIT_FLUSH_SECONDS", 5)))
+audit.start()
+
+# Folder that agent follow-up .eml files are written to (picked up by a local SMTP stand-in / outbox relay).
+outbox_dir = get_setting("TAKEON_OUTBOX_DIR", os.path.join(cache_dir, "outbox"))
+
+# Tables each job kind writes (uploads name theirs in the payload).
+JOB_WRITES = {"initialize_checklist": ("Checklist",), "client_report": ("Projects",)}
+
+def finish_job(job):
+    """Drops this process's cached copies of what a finished job wrote; the worker ran in another process."""
+    tables = JOB_WRITES.get(job["kind"], ()) + ((job["payload"]["table"],) if job["payload"].get("table") else ())
+    for t in tables:
+        if t in INDEXED_TABLES: _drop_index(t)
+        else: _invalidate(t)
+
 # --- AUTH ---
 def login_user(email, password):
     try:
@@ -35,34 +144,185 @@ def login_user(email, password):
         return None, str(e)
 
 def log_access(user_email):
-    try:
-        supabase.table("LoginLogs").insert({"user_email": user_email}).execute()
-    except Exception as e:
-        pass
+    """Queues a login event; the audit flusher writes it, so login never waits on it."""
+    audit.record("login", user=user_email)
 
 # --- STORAGE ---
 def upload_file_to_supabase(file_obj, file_path):
+    return upload_bytes_to_supabase(file_obj, file_path, file_obj.type)
+
+def upload_bytes_to_supabase(data, file_path, content_type):
     try:
         bucket_name = "takeon_docs"
-        supabase.storage.from_(bucket_name).upload(file_path, file_obj, {"content-type": file_obj.type, "upsert": "true"})
+        supabase.storage.from_(bucket_name).upload(file_path, data, {"content-type": content_type, "upsert": "true"})
         return supabase.storage.from_(bucket_name).get_public_url(file_path)
     except Exception as e:
         return None
 
-def update_document_url(table_name, row_id, url):
+def update_document_url(table_name, row_id, url, user=None):
     try:
+        old = _previous_rows(table_name, [row_id])
         supabase.table(table_name).update({"Document URL": url}).eq("id", row_id).execute()
+        audit.record_changes(table_name, old, [{"id": row_id, "Document URL": url}], user)
+        _patch_index(table_name, [{"id": row_id, "Document URL": url}])
         return "SUCCESS"
     except Exception as e: return str(e)
 
 # --- FETCH ---
+def _invalidate(table_name):
+    if replica is not None: replica.invalidate(table_name)
+    _publish_write(table_name)
+
+def _load_frame(table_name):
+    data = _fetch_rows(table_name)
+    return pd.DataFrame(data) if data else pd.DataFrame()
+
+def iter_table_pages(table_name, page_size=1000):
+    """Yields a whole table as DataFrames of at most page_size rows, paging by id (keyset, so every page is an index scan)."""
+    last_id = None
+    while True:
+        q = supabase.table(table_name).select("*").order("id").limit(page_size)
+        if last_id is not None: q = q.gt("id", last_id)
+        rows = q.execute().data or []
+        if not rows: return
+        yield pd.DataFrame(rows)
+        if len(rows) < page_size: return
+        last_id = rows[-1]["id"]
+
 def get_data(table_name):
-    try:
-        response = supabase.table(table_name).select("*").execute()
-        data = response.data
-        return pd.DataFrame(data) if data else pd.DataFrame()
+    if replica is not None and table_name in replica.tables:
+        df = replica.get(table_name)
+        if df is not None: return df
+    if table_name in INDEXED_TABLES:
+        return _get_index(table_name).df.copy()
+    try: return _load_frame(table_name)
     except Exception as e: return pd.DataFrame()
 
+# --- LOAD-TIME NORMALISATION ---
+BOOL_COLUMNS = ("Received", "Delete", "Payslip Received", "Contract Received", "Tax Ref Received")
+CATEGORY_COLUMNS = ("Task Heading", "Responsibility", "Timing", "Complex Name")
+
+def _category_flag(col, pattern):
+    """Runs the regex once per category instead of once per row."""
+    cats = col.cat.categories
+    if len(cats) == 0: return pd.Series(False, index=col.index)
+    hits = np.asarray(cats.astype(str).str.contains(pattern, case=False, na=False, regex=True), dtype=bool)
+    codes = col.cat.codes.to_numpy()
+    return pd.Series(np.where(codes >= 0, hits[codes], False), index=col.index)
+
+def normalise_frame(df):
+    """
+    Typed schema for loaded tables:
+    1. Booleans that come back as True/'true'/None become real bools.
+    2. Low-cardinality text columns become categoricals.
+    3. is_agent / is_internal are computed once from Responsibility.
+    """
+    if df.empty: return df
+    for c in BOOL_COLUMNS:
+        if c in df.columns: df[c] = df[c].astype(str).str.lower() == 'true'
+    for c in CATEGORY_COLUMNS:
+        if c in df.columns: df[c] = df[c].astype('category')
+    if 'Responsibility' in df.columns:
+        df['is_agent'] = _category_flag(df['Responsibility'], 'Agent|Both')
+        df['is_internal'] = _category_flag(df['Responsibility'], 'Pretor|Both')
+    return df
+
+# --- PER-COMPLEX INDEX (Checklist & sub-tables) ---
+INDEXED_TABLES = ("Checklist", "Employees", "Arrears", "Council", "council")
+index_ttl = float(get_setting("TAKEON_INDEX_TTL_SECONDS", 30))
+_indexes = {}
+_index_gen = {}   # table -> bumped on every local change, so a load that overlapped one isn't cached
+_index_lock = threading.Lock()   # Guards _indexes / _index_gen only; never held across a network load.
+_load_locks = {t: threading.Lock() for t in INDEXED_TABLES}   # One loader per table.
+_load_failed = {}   # table -> time of its last failed load; not retried for index_ttl (e.g. a missing legacy 'council' table)
+
+def _get_index(table_name):
+    """Returns the loaded table with its complex index, reloading once it is older than index_ttl."""
+    idx = _indexes.get(table_name)
+    if idx is not None and idx.age() <= index_ttl: return idx
+    if time.time() - _load_failed.get(table_name, 0) < index_ttl: return idx or ComplexIndex(pd.DataFrame())
+    lock = _load_locks[table_name]
+    if not lock.acquire(blocking=idx is None): return idx  # Another session is reloading: serve the expiring copy meanwhile.
+    try:
+        with _index_lock: idx, gen = _indexes.get(table_name), _index_gen.get(table_name, 0)
+        if idx is not None and idx.age() <= index_ttl: return idx  # Loaded by another session meanwhile.
+        try: idx = ComplexIndex(normalise_frame(_load_frame(table_name)))
+        except Exception:  # Don't cache a failed load; keep serving the expiring copy, if any, until the retry.
+            _load_failed[table_name] = time.time()
+            return idx or ComplexIndex(pd.DataFrame())
+        _load_failed.pop(table_name, None)
+        with _index_lock:
+            if _index_gen.get(table_name, 0) == gen: _indexes[table_name] = idx
+        return idx
+    finally: lock.release()
+
+def _forget_index(table_name):
+    """Drops the loaded copy (caller holds _index_lock)."""
+    _indexes.pop(table_name, None)
+    _load_failed.pop(table_name, None)
+    _index_gen[table_name] = _index_gen.get(table_name, 0) + 1
+
+def _patch_index(table_name, records):
+    """Keeps a loaded index current after updates by id; drops it if the rows can't be patched."""
+    with _index_lock:
+        _index_gen[table_name] = _index_gen.get(table_name, 0) + 1  # A load in flight may predate this write.
+        idx = _indexes.get(table_name)
+        patched = idx is not None and idx.apply_updates(records)
+        if idx is not None and not patched: _forget_index(table_name)
+        changed = idx.rows_by_id(r.get('id') for r in records) if patched and table_name == "Checklist" else None
+    if changed is not None:  # Outside _index_lock: a search sync may hold _search_lock for a while.
+        with _search_lock: search_index.update_rows("Checklist", changed)
+    _publish_write(table_name)
+
+def _drop_index(table_name):
+    with _index_lock: _forget_index(table_name)
+    _publish_write(table_name)
+
+def _apply_remote_write(table_name):
+    """Another process wrote to table_name: drop our in-memory copies so the next read reloads."""
+    if replica is not None: replica.invalidate(table_name)
+    with _index_lock: _forget_index(table_name)
+
+if shared_cache is not None:
+    shared_cache.on_invalidate(_apply_remote_write)
+    shared_cache.start()
+
+def _previous_rows(table_name, ids):
+    """{id: row} as currently held in memory, for audit diffs. Never loads: unknown rows just have no old values."""
+    with _index_lock: idx = _indexes.get(table_name)
+    if idx is None: return {}
+    return {r['id']: r for r in idx.rows_by_id(ids).to_dict('records')}
+
+def get_complex_data(table_name, complex_name):
+    """Returns one complex's rows from an indexed table (O(1) lookup, no full-table mask)."""
+    return _get_index(table_name).rows(complex_name)
+
+def has_rows(table_name):
+    """Whether an indexed table has any rows at all (checked on the loaded index, without copying it)."""
+    return not _get_index(table_name).df.empty
+
+def council_table():
+    """'Council', or the legacy lowercase 'council' table when 'Council' has no rows at all (not when one building has none)."""
+    return "Council" if has_rows("Council") else "council"
+
+# --- SEARCH (Checklist + Master) ---
+search_index = SearchIndex()
+_search_lock = threading.Lock()
+
+def search_items(query, page=1, per_page=10, pending_only=False):
+    """
+    Ranked full-text search over checklist items (Task Name, Notes, Task Heading) and Master tasks, grouped by complex.
+    A Checklist reload re-indexes only the rows that changed; Master is re-indexed when its replica copy changes.
+    Saves patch the index row by row.
+    """
+    chk = _get_index("Checklist")
+    master_token = replica.version("Master") if replica is not None else None
+    with _search_lock:
+        search_index.sync_source("Checklist", chk.df, (id(chk), chk.loaded_at))
+        if master_token is None or search_index.tokens.get("Master") != master_token:
+            search_index.load_source("Master", get_data("Master"), master_token)
+        return search_index.search(query, page=page, per_page=per_page, pending_only=pending_only)
+
 # --- CHECKLIST LOGIC (SMART AUTO-LOAD) ---
 def find_val(row, targets, default=""):
     """Finds value in row dictionary by checking multiple key variations."""
@@ -74,16 +334,18 @@ def find_val(row, targets, default=""):
             return val if val is not None else default
     return default
 
-def initialize_checklist(complex_name, building_type_full):
+def initialize_checklist(complex_name, building_type_full, progress=None, user=None):
     """
     Copies from Master -> Checklist.
     1. Clears old data for complex.
     2. Maps 'Body Corporate' -> 'BC' logic.
     3. Copies Responsibility exactly as found in Master.
+    progress(fraction, message) is called per inserted chunk when run as a job.
     """
     try:
         # 1. Delete existing (clean slate)
         supabase.table("Checklist").delete().eq("Complex Name", complex_name).execute()
+        _drop_index("Checklist")
         
         # 2. Get Master
         master_res = supabase.table("Master").select("*").execute()
@@ -97,7 +359,7 @@ def initialize_checklist(complex_name, building_type_full):
         new_rows = []
         for item in master_items:
             # Get values robustly
-            cat_ raw = find_val(item, ["Category", "category", "Cat"], "Both")
+            cat_raw = find_val(item, ["Category", "category", "Cat"], "Both")
             name = find_val(item, ["Task Name", "task_name", "Task"], "")
             head = find_val(item, ["Heading", "heading", "Task Heading"], "General")
             resp = find_val(item, ["Responsibility", "responsibility", "Resp"], "Both") # Default Both if missing
@@ -136,6 +398,9 @@ def initialize_checklist(complex_name, building_type_full):
             for i in range(0, len(new_rows), chunk_size):
                 batch = new_rows[i:i + chunk_size]
                 supabase.table("Checklist").insert(batch).execute()
+                if progress: progress(min(i + chunk_size, len(new_rows)) / len(new_rows), f"Inserted {min(i + chunk_size, len(new_rows))} of {len(new_rows)} items")
+            _drop_index("Checklist")
+            audit.record("initialize", user, "Checklist", complex_name=complex_name, new=f"{len(new_rows)} items")
             return "SUCCESS"
         
         return "NO_MATCHING_ITEMS"
@@ -143,29 +408,39 @@ def initialize_checklist(complex_name, building_type_full):
     except Exception as e:
         return f"Error: {str(e)}"
 
+# Shown in the checklist editors but not editable there; never written back (they'd overwrite with display values).
+CHECKLIST_DISPLAY_ONLY = ("Task Heading", "Task Name")
+
 def save_checklist_batch(complex_name, edited_df, current_user_email):
     try:
         records = edited_df.to_dict('records')
+        old = _previous_rows("Checklist", [r['id'] for r in records if r.get('id')])
+        patched = []
         for row in records:
             if row.get('id'):
-                update_data = {k: v for k, v in row.items() if k != 'id'}
+                update_data = {k: v for k, v in row.items() if k != 'id' and k not in CHECKLIST_DISPLAY_ONLY}
                 if str(row.get('Received')).lower() == 'true':
                     update_data['Completed By'] = current_user_email
                 supabase.table("Checklist").update(update_data).eq("id", row['id']).execute()
+                patched.append({"id": row['id'], **update_data})
+        audit.record_changes("Checklist", old, patched, current_user_email)
+        _patch_index("Checklist", patched)
         return "SUCCESS"
     except Exception as e: return str(e)
 
 # --- PROJECTS ---
 def create_new_building(data):
+    # Duplicates are rejected by the UNIQUE constraint on "Complex Name" (migrations/002).
     try:
-        existing = supabase.table("Projects").select("*").eq("Complex Name", data["Complex Name"]).execute()
-        if existing.data: return "EXISTS"
         supabase.table("Projects").insert(data).execute()
+        _invalidate("Projects")
         return "SUCCESS"
-    except Exception as e: return str(e)
+    except Exception as e:
+        if getattr(e, "code", None) == "23505" or "duplicate key" in str(e): return "EXISTS"
+        return str(e)
 
 def update_building_details_batch(complex_name, updates):
-    try: supabase.table("Projects").update(updates).eq("Complex Name", complex_name).execute(); return "SUCCESS"
+    try: supabase.table("Projects").update(updates).eq("Complex Name", complex_name).execute(); _invalidate("Projects"); return "SUCCESS"
     except Exception as e: return str(e)
 
 def update_project_agent_details(c, n, e): return update_building_details_batch(c, {"Agent Name": n, "Agent Email": e})
@@ -174,40 +449,72 @@ def update_email_status(c, col, v=None): return update_building_details_batch(c,
 def finalize_project_db(c): return update_building_details_batch(c, {"Status": "Finalized", "Finalized Date": str(datetime.now().date())})
 
 # --- SUB-TABLES (STANDARD) ---
-def add_employee(c, n, s, i, p, sal, pb, cb, tb):
-    try: supabase.table("Employees").insert({"Complex Name": c, "Name": n, "Surname": s, "ID Number": i, "Position": p, "Salary": sal, "Payslip Received": pb, "Contract Received": cb, "Tax Ref Received": tb}).execute()
+def add_employee(c, n, s, i, p, sal, pb, cb, tb, user=None):
+    try: supabase.table("Employees").insert({"Complex Name": c, "Name": n, "Surname": s, "ID Number": i, "Position": p, "Salary": sal, "Payslip Received": pb, "Contract Received": cb, "Tax Ref Received": tb}).execute(); _drop_index("Employees"); audit.record("insert", user, "Employees", complex_name=c, new=f"{n} {s}")
     except Exception as e: raise e
-def update_employee_batch(df):
+def update_employee_batch(df, user=None):
     try:
-        for r in df.to_dict('records'): 
-            if r.get('id'): supabase.table("Employees").update({k:v for k,v in r.items() if k!='id'}).eq("id", r['id']).execute()
+        records = df.to_dict('records')
+        old = _previous_rows("Employees", [r['id'] for r in records if r.get('id')])
+        saved = []
+        try:
+            for r in records: 
+                if r.get('id'): supabase.table("Employees").update({k:v for k,v in r.items() if k!='id'}).eq("id", r['id']).execute(); saved.append(r)
+        finally:  # One index patch / cache invalidation / audit pass per save, covering the rows written before any error.
+            if saved: audit.record_changes("Employees", old, saved, user); _patch_index("Employees", saved)
         return "SUCCESS"
     except Exception as e: return str(e)
-def add_council_account(c, a, s, b):
-    try: supabase.table("Council").insert({"Complex Name": c, "Account Number": a, "Service": s, "Balance": b}).execute()
+def add_council_account(c, a, s, b, user=None):
+    try: supabase.table("Council").insert({"Complex Name": c, "Account Number": a, "Service": s, "Balance": b}).execute(); _drop_index("Council"); audit.record("insert", user, "Council", complex_name=c, new=str(a))
     except Exception as e: print(e)
-def update_council_batch(df):
+def update_council_batch(df, user=None):
     try:
-        for r in df.to_dict('records'): 
-            if r.get('id'): supabase.table("Council").update({k:v for k,v in r.items() if k!='id'}).eq("id", r['id']).execute()
+        records = df.to_dict('records')
+        old = _previous_rows("Council", [r['id'] for r in records if r.get('id')])
+        saved = []
+        try:
+            for r in records: 
+                if r.get('id'): supabase.table("Council").update({k:v for k,v in r.items() if k!='id'}).eq("id", r['id']).execute(); saved.append(r)
+        finally:  # One index patch / cache invalidation / audit pass per save, covering the rows written before any error.
+            if saved: audit.record_changes("Council", old, saved, user); _patch_index("Council", saved)
         return "SUCCESS"
     except Exception as e: return str(e)
-def add_arrears_item(c, u, a, n, e, p):
-    try: supabase.table("Arrears").insert({"Complex Name": c, "Unit Number": u, "Outstanding Amount": a, "Attorney Name": n, "Attorney Email": e, "Attorney Phone": p}).execute()
+def add_arrears_item(c, u, a, n, e, p, user=None):
+    try: supabase.table("Arrears").insert({"Complex Name": c, "Unit Number": u, "Outstanding Amount": a, "Attorney Name": n, "Attorney Email": e, "Attorney Phone": p}).execute(); _drop_index("Arrears"); audit.record("insert", user, "Arrears", complex_name=c, new=f"{u}: {a}")
     except Exception as e: raise e
-def update_arrears_batch(df):
+def update_arrears_batch(df, user=None):
     try:
-        for r in df.to_dict('records'): 
-            if r.get('id'): supabase.table("Arrears").update({k:v for k,v in r.items() if k!='id'}).eq("id", r['id']).execute()
+        records = df.to_dict('records')
+        old = _previous_rows("Arrears", [r['id'] for r in records if r.get('id')])
+        saved = []
+        try:
+            for r in records: 
+                if r.get('id'): supabase.table("Arrears").update({k:v for k,v in r.items() if k!='id'}).eq("id", r['id']).execute(); saved.append(r)
+        finally:  # One index patch / cache invalidation / audit pass per save, covering the rows written before any error.
+            if saved: audit.record_changes("Arrears", old, saved, user); _patch_index("Arrears", saved)
         return "SUCCESS"
     except Exception as e: return str(e)
+def bulk_insert(table_name, rows, user=None, chunk_size=100):
+    """Inserts validated import rows in chunks (as initialize_checklist does). Returns "SUCCESS" or the error with the rows done so far."""
+    done = 0
+    try:
+        for i in range(0, len(rows), chunk_size):
+            supabase.table(table_name).insert(rows[i:i + chunk_size]).execute()
+            done += len(rows[i:i + chunk_size])
+        return "SUCCESS"
+    except Exception as e: return f"Error after {done} of {len(rows)} rows: {e}"
+    finally:
+        if done:
+            _drop_index(table_name)
+            audit.record("import", user, table_name, complex_name=rows[0].get("Complex Name"), new=f"{done} rows")
 def add_master_item(n, cat, resp, head, time):
-    try: supabase.table("Master").insert({"Task Name": n, "Category": cat, "Responsibility": resp, "Heading": head, "Timing": time}).execute()
+    try: supabase.table("Master").insert({"Task Name": n, "Category": cat, "Responsibility": resp, "Heading": head, "Timing": time}).execute(); _invalidate("Master")
     except Exception as e: print(e)
 def save_global_settings(s):
     try:
         supabase.table("Settings").delete().neq("id", 0).execute()
         for k, v in s.items(): supabase.table("Settings").insert({"Department": k, "Email": v}).execute()
+        _invalidate("Settings")
     except Exception as e: print(e)
 # --- PLACEHOLDERS ---
 def add_service_provider(n, t, c): pass 
@@ -0,0 +1,170 @@
+"""
+Streams the take-on tables out of Supabase, page by page, into Parquet (default), CSV or Excel.
+
+    python exporter.py --out exports/                              # one Parquet file per table
+    python exporter.py --out exports/ --format csv --partition     # one file per table per complex
+    python exporter.py --out exports/ --format xlsx --tables Projects Checklist
+    python exporter.py --out exports/ --zip takeon_export.zip      # zipped, as the app's download
+
+Only one page is held in memory at a time. Parquet needs pyarrow, Excel needs openpyxl.
+"""
+import os
+import re
+import shutil
+import zipfile
+import argparse
+import importlib.util
+import pandas as pd
+
+import database as db
+from complex_index import COMPLEX_KEYS
+
+EXPORT_TABLES = ("Projects", "Checklist", "Employees", "Arrears", "Council")
+FORMATS = ("parquet", "csv", "xlsx")
+FORMAT_MODULES = {"parquet": "pyarrow", "xlsx": "openpyxl"}   # Optional libraries each format needs.
+PAGE_SIZE = 1000
+EXCEL_MAX_ROWS = 1_048_576   # Per sheet, header included.
+
+# Pinned column types, so every page and partition of a table has the same schema. Everything else is text.
+NUMERIC_COLUMNS = ("Salary", "Outstanding Amount", "Balance", "No of Units")
+DATE_SUFFIXES = ("Date", "_at")
+
+def typed_page(df):
+    """One page with stable types: Int64 ids, bools, floats, timestamps and strings."""
+    out = {}
+    for c in df.columns:
+        col = df[c]
+        if c == 'id': out[c] = pd.to_numeric(col, errors='coerce').astype('Int64')
+        elif c in db.BOOL_COLUMNS: out[c] = col.astype(str).str.lower() == 'true'
+        elif c in NUMERIC_COLUMNS: out[c] = pd.to_numeric(col, errors='coerce').astype('float64')
+        elif str(c).endswith(DATE_SUFFIXES): out[c] = pd.to_datetime(col, errors='coerce', format='ISO8601', utc=True).dt.tz_localize(None)
+        else: out[c] = col.astype('string')
+    return pd.DataFrame(out, index=df.index)
+
+def available_formats():
+    """The formats whose library is installed (CSV always is)."""
+    return tuple(f for f in FORMATS if f not in FORMAT_MODULES or importlib.util.find_spec(FORMAT_MODULES[f]) is not None)
+
+def _safe(name):
+    return re.sub(r'[^A-Za-z0-9._ -]+', '_', str(name)).strip() or "_blank"
+
+# --- SINKS (one output file each, appended page by page) ---
+class _ParquetSink:
+    def __init__(self, path):
+        import pyarrow as pa, pyarrow.parquet as pq  # Optional dependency, only needed for Parquet.
+        self.pa, self.pq, self.path, self.writer = pa, pq, path, None
+    def write(self, df):
+        if self.writer is None:
+            table = self.pa.Table.from_pandas(df, preserve_index=False)
+            self.writer = self.pq.ParquetWriter(self.path, table.schema, compression="zstd")
+        else:
+            table = self.pa.Table.from_pandas(df, schema=self.writer.schema, preserve_index=False)
+        self.writer.write_table(table)
+    def close(self):
+        if self.writer is not None: self.writer.close()
+
+class _CsvSink:
+    def __init__(self, path):
+        self.path, self.header = path, not os.path.exists(path)
+    def write(self, df):
+        df.to_csv(self.path, mode="a", header=self.header, index=False); self.header = False
+    def close(self): pass
+
+class _ExcelSheet:
+    """One table in the workbook; continues on 'Name (2)', 'Name (3)', ... once a sheet reaches Excel's row limit."""
+    def __init__(self, book, name):
+        self.book, self.name, self.sheets = book, name, 0
+        self._next_sheet()
+    def _next_sheet(self):
+        self.sheets += 1
+        suffix = f" ({self.sheets})" if self.sheets > 1 else ""
+        self.ws, self.rows = self.book.create_sheet(self.name[:31 - len(suffix)] + suffix), 0
+    def write(self, df):
+        header = [str(c) for c in df.columns]
+        for row in df.astype(object).where(df.notna(), None).itertuples(index=False, name=None):
+            if self.rows >= EXCEL_MAX_ROWS: self._next_sheet()
+            if self.rows == 0: self.ws.append(header); self.rows = 1
+            self.ws.append(row); self.rows += 1
+    def close(self): pass
+
+# --- EXPORT ---
+def export_table(table_name, pages, out_dir, fmt="parquet", partition=False, book=None, progress=None):
+    """
+    Writes one table from an iterable of pages. Returns the number of rows written.
+    progress(rows) is called after every page (a job's lease is renewed by its progress reports).
+    partition: one folder per complex, <table>/<complex>/part-NNNNN.parquet or <table>/<complex>/<table>.csv.
+    """
+    columns, rows = None, 0
+    ext = "parquet" if fmt == "parquet" else "csv"
+    # Start clean: CSV sinks append, so a previous export into the same folder would be duplicated.
+    shutil.rmtree(os.path.join(out_dir, table_name), ignore_errors=True)
+    if os.path.exists(os.path.join(out_dir, f"{table_name}.{ext}")): os.remove(os.path.join(out_dir, f"{table_name}.{ext}"))
+    if not partition:
+        sink = _ExcelSheet(book, table_name) if fmt == "xlsx" else (_ParquetSink if fmt == "parquet" else _CsvSink)(os.path.join(out_dir, f"{table_name}.{ext}"))
+    try:
+        for n, page in enumerate(pages):
+            if page.empty: continue
+            columns = columns or list(page.columns)
+            page = typed_page(page.reindex(columns=columns))
+            rows += len(page)
+            if not partition: sink.write(page)
+            else:
+                key = next((c for c in columns if str(c).strip() in COMPLEX_KEYS), None)
+                for complex_name, part in (page.groupby(page[key].fillna(""), sort=False) if key else [("_all", page)]):
+                    folder = os.path.join(out_dir, table_name, _safe(complex_name))
+                    os.makedirs(folder, exist_ok=True)
+                    if fmt == "parquet":  # One part file per page keeps no writer open per complex.
+                        s = _ParquetSink(os.path.join(folder, f"part-{n:05d}.parquet")); s.write(part); s.close()
+                    else:
+                        _CsvSink(os.path.join(folder, f"{table_name}.csv")).write(part)
+            if progress: progress(rows)
+    finally:
+        if not partition: sink.close()
+    return rows
+
+def export_portfolio(out_dir, fmt="parquet", tables=EXPORT_TABLES, partition=False, page_size=PAGE_SIZE, progress=None):
+    """Exports each table into out_dir; returns {table: rows}. progress(fraction, message) is called per page."""
+    if fmt not in FORMATS: raise ValueError(f"Unknown format: {fmt}")
+    if fmt not in available_formats(): raise ImportError(f"{fmt} export needs {FORMAT_MODULES[fmt]}: pip install {FORMAT_MODULES[fmt]}")
+    if fmt == "xlsx" and partition: raise ValueError("Per-complex partitioning is available for Parquet and CSV only.")
+    os.makedirs(out_dir, exist_ok=True)
+    book = None
+    if fmt == "xlsx":
+        from openpyxl import Workbook  # Optional dependency, only needed for Excel.
+        book = Workbook(write_only=True)
+    counts = {}
+    for i, t in enumerate(tables):
+        if progress: progress(i / len(tables), f"Exporting {t}")
+        on_page = (lambda rows, i=i, t=t: progress(i / len(tables), f"Exporting {t}: {rows:,} rows")) if progress else None
+        counts[t] = export_table(t, db.iter_table_pages(t, page_size), out_dir, fmt, partition, book, on_page)
+    if book is not None:
+        if progress: progress(1.0, "Saving workbook")
+        book.save(os.path.join(out_dir, "takeon_export.xlsx"))
+    return counts
+
+def zip_dir(src_dir, zip_path):
+    """Zips an export folder (streamed from disk, file by file)."""
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for root, _, files in os.walk(src_dir):
+            for f in files:
+                full = os.path.join(root, f)
+                zf.write(full, os.path.relpath(full, src_dir))
+    return zip_path
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", required=True, help="output folder")
+    parser.add_argument("--format", choices=FORMATS, default="parquet" if "parquet" in available_formats() else "csv")
+    parser.add_argument("--tables", nargs="+", default=list(EXPORT_TABLES))
+    parser.add_argument("--partition", action="store_true", help="one file per complex (Parquet / CSV)")
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE)
+    parser.add_argument("--zip", help="also zip the folder to this path")
+    args = parser.parse_args()
+
+    counts = export_portfolio(args.out, args.format, args.tables, args.partition, args.page_size,
+                              progress=lambda f, m: print(m))
+    for t, n in counts.items(): print(f"{t:<12}{n:>10,} rows")
+    if args.zip: print(f"Wrote {zip_dir(args.out, args.zip)}")
+
+if __name__ == "__main__":
+    main()
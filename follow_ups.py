@@ -0,0 +1,86 @@
+import os
+import re
+import io
+import zipfile
+from string import Template
+from email.message import EmailMessage
+
+# Compiled once; substitute() per agent.
+SUBJECT = Template("Outstanding Handover Items: $buildings")
+BODY = Template("""Dear $name,
+
+We are still awaiting the following handover items for $count_text. Please provide them as soon as possible, and by the 10th at the latest.
+
+$sections
+Regards,
+Pretor Group""")
+SECTION = Template("$complex ($count outstanding):\n$items\n")
+
+def _pending_agent_items(checklist_df):
+    df = checklist_df
+    received = df['Received'] if df['Received'].dtype == bool else df['Received'].astype(str).str.lower() == 'true'
+    deleted = df['Delete'] if df['Delete'].dtype == bool else df['Delete'].astype(str).str.lower() == 'true'
+    is_agent = df['is_agent'] if 'is_agent' in df.columns else df['Responsibility'].astype(str).str.contains('Agent|Both', case=False, na=False)
+    return df.loc[is_agent & ~received & ~deleted, ['Complex Name', 'Task Heading', 'Task Name']].astype(str)
+
+def _agent_contacts(projects_df):
+    """Complex Name -> Agent Email / Agent Name for buildings with a usable agent email."""
+    agents = projects_df[['Complex Name', 'Agent Email']].astype(str).copy()
+    agents['Agent Email'] = agents['Agent Email'].str.strip().str.lower()
+    agents['Agent Name'] = projects_df['Agent Name'].astype(str).str.strip().values if 'Agent Name' in projects_df.columns else ""
+    return agents[agents['Agent Email'].str.contains('@', na=False)]
+
+def build_follow_ups(checklist_df, projects_df):
+    """
+    One consolidated follow-up per previous agent, covering every active building they still owe items on.
+    Pending agent items are joined to Projects on Complex Name and grouped by Agent Email in a single pass.
+    Returns [{to, name, subject, body, buildings, items}], largest backlog first.
+    """
+    if checklist_df.empty or projects_df.empty or 'Agent Email' not in projects_df.columns: return []
+    projs = projects_df[projects_df['Status'].astype(str) != 'Finalized'] if 'Status' in projects_df.columns else projects_df
+    agents = _agent_contacts(projs)
+    items = _pending_agent_items(checklist_df).merge(agents, on='Complex Name', how='inner')
+    if items.empty: return []
+    items = items.sort_values(['Agent Email', 'Complex Name', 'Task Heading', 'Task Name'])
+
+    messages = []
+    for email, grp in items.groupby('Agent Email', sort=False):
+        sections = []
+        for complex_name, tasks in grp.groupby('Complex Name', sort=False)['Task Name']:
+            sections.append(SECTION.substitute(complex=complex_name, count=len(tasks), items="\n".join(f"- {t}" for t in tasks)))
+        buildings = grp['Complex Name'].unique().tolist()
+        name = next((n for n in grp['Agent Name'] if n and n not in ('None', 'nan')), "Agent")
+        count_text = buildings[0] if len(buildings) == 1 else f"{len(buildings)} buildings"
+        messages.append({
+            "to": email, "name": name, "buildings": buildings, "items": len(grp),
+            "subject": SUBJECT.substitute(buildings=buildings[0] if len(buildings) == 1 else f"{len(buildings)} buildings"),
+            "body": BODY.substitute(name=name, count_text=count_text, sections="\n".join(sections)),
+        })
+    return sorted(messages, key=lambda m: -m["items"])
+
+# --- .EML OUTPUT (for a local SMTP stand-in / outbox folder) ---
+def to_eml(message, sender):
+    msg = EmailMessage()
+    msg['From'], msg['To'], msg['Subject'] = sender, message['to'], message['subject']
+    msg.set_content(message['body'])
+    return msg.as_bytes()
+
+def _eml_name(message):
+    return re.sub(r'[^A-Za-z0-9._-]+', '_', message['to']) + ".eml"
+
+def write_eml_files(messages, out_dir, sender):
+    """Writes one .eml per message into out_dir; returns the file paths."""
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for m in messages:
+        path = os.path.join(out_dir, _eml_name(m))
+        with open(path, "wb") as f: f.write(to_eml(m, sender))
+        paths.append(path)
+    return paths
+
+def eml_zip(messages, sender):
+    """All messages as .eml files in one zip (bytes), for download."""
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        for m in messages: zf.writestr(_eml_name(m), to_eml(m, sender))
+    return buf.getvalue()
@@ -0,0 +1,127 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+class JobQueue:
+    """
+    SQLite-backed queue for long-running work (checklist loads, reports, uploads).
+    1. The app submits jobs and polls them; worker processes (worker.py) claim and run them, checking in while idle.
+    2. A job whose worker died is re-claimed once its lease expires.
+    3. Failures are retried with backoff up to max_retries, then marked failed with the error.
+    """
+    def __init__(self, path, lease=600):
+        self.path = path
+        self.lease = lease
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as con:
+            con.execute("""CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY, kind TEXT, payload TEXT, input BLOB, status TEXT, progress REAL, message TEXT,
+                attempts INTEGER, max_retries INTEGER, run_after REAL, heartbeat REAL, worker TEXT,
+                result BLOB, error TEXT, created_at REAL, updated_at REAL)""")
+            con.execute("CREATE INDEX IF NOT EXISTS jobs_status_run_after ON jobs (status, run_after)")
+            con.execute("CREATE TABLE IF NOT EXISTS workers (id TEXT PRIMARY KEY, seen_at REAL)")
+
+    def _connect(self):
+        con = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        con.execute("PRAGMA journal_mode = WAL")
+        return con
+
+    def _update(self, job_id, worker_id=None, **fields):
+        """Updates a job; with worker_id, only while that worker still holds it. Returns False if nothing was updated."""
+        fields["updated_at"] = time.time()
+        where, params = "id = ?", [job_id]
+        if worker_id is not None: where, params = "id = ? AND worker = ? AND status = ?", [job_id, worker_id, RUNNING]
+        with self._connect() as con:
+            cur = con.execute(f"UPDATE jobs SET {', '.join(f'{k} = ?' for k in fields)} WHERE {where}", (*fields.values(), *params))
+            return cur.rowcount > 0
+
+    # --- APP SIDE ---
+    def submit(self, kind, payload=None, data=None, max_retries=2):
+        """Queues a job and returns its id. data is optional binary input (e.g. file bytes)."""
+        job_id, now = uuid.uuid4().hex, time.time()
+        with self._connect() as con:
+            con.execute("INSERT INTO jobs (id, kind, payload, input, status, progress, message, attempts, max_retries, run_after, created_at, updated_at) "
+                        "VALUES (?, ?, ?, ?, ?, 0, 'Queued', 0, ?, ?, ?, ?)",
+                        (job_id, kind, json.dumps(payload or {}, default=str), data, QUEUED, max_retries, now, now, now))
+        return job_id
+
+    def get(self, job_id):
+        """Job as a dict (status, progress, message, attempts, result, error, ...), or None."""
+        with self._connect() as con:
+            con.row_factory = sqlite3.Row
+            row = con.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None: return None
+        job = dict(row); job["payload"] = json.loads(job["payload"] or "{}")
+        return job
+
+    def recent(self, limit=20):
+        """Latest jobs without their binary input/result, newest first."""
+        with self._connect() as con:
+            con.row_factory = sqlite3.Row
+            rows = con.execute("SELECT id, kind, payload, status, progress, message, attempts, error, created_at, updated_at "
+                               "FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+        return [dict(r) for r in rows]
+
+    def workers_alive(self, within=30):
+        """Workers that checked in, or reported progress on a job, in the last `within` seconds."""
+        cutoff = time.time() - within
+        with self._connect() as con:
+            return con.execute("SELECT (SELECT COUNT(*) FROM workers WHERE seen_at > ?) + "
+                               "(SELECT COUNT(DISTINCT worker) FROM jobs WHERE status = ? AND heartbeat > ?)",
+                               (cutoff, RUNNING, cutoff)).fetchone()[0]
+
+    # --- WORKER SIDE ---
+    def beat(self, worker_id):
+        """Records that an idle worker is polling (see workers_alive)."""
+        with self._connect() as con:
+            con.execute("INSERT OR REPLACE INTO workers (id, seen_at) VALUES (?, ?)", (worker_id, time.time()))
+
+    def claim(self, worker_id):
+        """Atomically takes the oldest runnable job (or one whose lease expired). Returns it or None."""
+        now = time.time()
+        con = self._connect()
+        try:
+            con.execute("BEGIN IMMEDIATE")
+            row = con.execute("SELECT id FROM jobs WHERE (status = ? AND run_after <= ?) OR (status = ? AND heartbeat < ?) "
+                              "ORDER BY created_at LIMIT 1", (QUEUED, now, RUNNING, now - self.lease)).fetchone()
+            if row is None: con.execute("COMMIT"); return None
+            con.execute("UPDATE jobs SET status = ?, worker = ?, heartbeat = ?, attempts = attempts + 1, message = 'Running', updated_at = ? WHERE id = ?",
+                        (RUNNING, worker_id, now, now, row[0]))
+            con.execute("COMMIT")
+        except sqlite3.Error:
+            if con.in_transaction: con.execute("ROLLBACK")
+            return None
+        finally:
+            con.close()
+        return self.get(row[0])
+
+    # progress / complete / fail only apply while worker_id still holds the job: once its lease expired and the job
+    # was re-claimed, a late update from the old worker must not overwrite the new run.
+    def progress(self, job_id, worker_id, fraction, message=None):
+        """Reports progress (0..1) and renews the lease. Returns False if the job is no longer this worker's."""
+        fields = {"progress": max(0.0, min(1.0, float(fraction))), "heartbeat": time.time()}
+        if message is not None: fields["message"] = message
+        return self._update(job_id, worker_id, **fields)
+
+    def complete(self, job_id, worker_id, result=None, message="Done"):
+        if isinstance(result, str): result = result.encode()
+        return self._update(job_id, worker_id, status=DONE, progress=1.0, message=message, result=result, error=None)
+
+    def fail(self, job_id, worker_id, error, retry=True):
+        """Re-queues with exponential backoff while retries remain (and retry is set), otherwise marks the job failed."""
+        job = self.get(job_id)
+        if job is None: return False
+        if retry and job["attempts"] <= job["max_retries"]:
+            delay = 5 * 2 ** (job["attempts"] - 1)
+            return self._update(job_id, worker_id, status=QUEUED, run_after=time.time() + delay, message=f"Retrying in {delay}s", error=str(error))
+        return self._update(job_id, worker_id, status=FAILED, message="Failed", error=str(error))
+
+    def purge(self, older_than=7 * 86400):
+        """Deletes finished jobs (and their stored results) older than older_than seconds."""
+        with self._connect() as con:
+            con.execute("DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?", (DONE, FAILED, time.time() - older_than))
+            con.execute("DELETE FROM workers WHERE seen_at < ?", (time.time() - older_than,))
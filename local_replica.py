@@ -0,0 +1,143 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+import pandas as pd
+
+# Reference tables that change rarely but are read on almost every page.
+REPLICA_TABLES = ("Master", "Settings", "Projects")
+
+class LocalReplica:
+    """
+    On-disk (SQLite) replica of selected tables, stored as one JSON row per table.
+    1. Loads the last known copy from disk at process start (the only time the disk is read; pages use the frames in memory).
+    2. Re-fetches a table when its version probe changes, it gets too old, or a local write invalidates it.
+    3. Runs the version check on a background thread so pages never wait on it, starting with one check right away.
+    """
+    def __init__(self, cache_dir, fetch_rows, probe_version, tables=REPLICA_TABLES, refresh_interval=60, max_age=900, retry_after=30):
+        self.tables = tuple(tables)
+        self.fetch_rows = fetch_rows          # (table, probed version) -> list of row dicts (raises on failure)
+        self.probe_version = probe_version    # table -> cheap version string (raises on failure)
+        self.refresh_interval = refresh_interval
+        self.max_age = max_age
+        self.retry_after = retry_after        # seconds before a page read retries a failed fetch
+        self.path = os.path.join(cache_dir, "replica.sqlite3")
+        self._lock = threading.RLock()
+        self._frames = {}
+        self._meta = {}   # table -> (version, fetched_at)
+        self._stale = set()
+        self._gen = {}          # table -> bumped by invalidate(), so a fetch that overlapped a write leaves it stale
+        self._retry_at = {}     # table -> no page-triggered fetch before this time (after a failure)
+        self._fetch_locks = {t: threading.Lock() for t in self.tables}   # Held across the network fetch instead of _lock.
+        self._thread = None
+        self._pid = None
+        os.makedirs(cache_dir, exist_ok=True)
+        with self._connect() as con:
+            con.execute("CREATE TABLE IF NOT EXISTS replica (name TEXT PRIMARY KEY, version TEXT, fetched_at REAL, rows TEXT)")
+        self.load()
+
+    def _connect(self):
+        con = sqlite3.connect(self.path, timeout=10)
+        con.execute("PRAGMA journal_mode = WAL")
+        return con
+
+    # --- DISK ---
+    def load(self):
+        """Reads every stored table from disk into memory."""
+        try:
+            with self._connect() as con:
+                stored = con.execute("SELECT name, version, fetched_at, rows FROM replica").fetchall()
+        except sqlite3.Error:
+            return
+        with self._lock:
+            for name, version, fetched_at, rows in stored:
+                if name not in self.tables: continue
+                data = json.loads(rows)
+                self._frames[name] = pd.DataFrame(data) if data else pd.DataFrame()
+                self._meta[name] = (version, fetched_at)
+
+    def _store(self, table, rows, version, gen):
+        fetched_at = time.time()
+        try:
+            with self._connect() as con:
+                con.execute("INSERT OR REPLACE INTO replica (name, version, fetched_at, rows) VALUES (?, ?, ?, ?)",
+                            (table, version, fetched_at, json.dumps(rows, default=str)))
+        except sqlite3.Error:
+            pass  # Memory copy is still valid; disk catches up on the next refresh.
+        with self._lock:
+            self._frames[table] = pd.DataFrame(rows) if rows else pd.DataFrame()
+            self._meta[table] = (version, fetched_at)
+            if self._gen.get(table, 0) == gen: self._stale.discard(table)
+
+    # --- NETWORK ---
+    def _probe(self, table):
+        try: return self.probe_version(table)
+        except Exception: return None
+
+    def refresh(self, table, wait=True):
+        """Fetches a table from the backend and stores it. Returns False if the fetch failed (or, without wait, is already running)."""
+        lock = self._fetch_locks[table]
+        if not lock.acquire(blocking=wait): return False
+        try:
+            with self._lock: gen = self._gen.get(table, 0)
+            version = self._probe(table)
+            try: rows = self.fetch_rows(table, version)
+            except Exception:
+                self._retry_at[table] = time.time() + self.retry_after
+                return False
+            self._retry_at.pop(table, None)
+            self._store(table, rows, version, gen)
+            return True
+        finally:
+            lock.release()
+
+    def check(self):
+        """Refreshes every table whose version changed or whose copy is older than max_age."""
+        for table in self.tables:
+            meta = self._meta.get(table)
+            if meta is None or table in self._stale:
+                self.refresh(table); continue
+            version, fetched_at = meta
+            current = self._probe(table)
+            if (current is not None and current != version) or time.time() - (fetched_at or 0) > self.max_age:
+                self.refresh(table)
+
+    # --- PUBLIC ---
+    def get(self, table):
+        """
+        Returns a copy of the replicated table, or None if it is unavailable.
+        A stale table is re-fetched by the first reader; readers arriving meanwhile get the stale copy instead of waiting,
+        and after a failed fetch pages keep the stale copy for retry_after seconds rather than retrying every read.
+        """
+        with self._lock:
+            df = self._frames.get(table)
+            due = table in self._stale or df is None
+        if due and time.time() >= self._retry_at.get(table, 0):
+            self.refresh(table, wait=df is None)
+            with self._lock: df = self._frames.get(table)
+        return df.copy() if df is not None else None
+
+    def version(self, table):
+        """(version, fetched_at) of the copy in memory; changes whenever the table is re-fetched."""
+        return self._meta.get(table)
+
+    def invalidate(self, table):
+        """Marks a table stale after a local write; the next read re-fetches it."""
+        with self._lock:
+            if table not in self.tables: return
+            self._stale.add(table)
+            self._gen[table] = self._gen.get(table, 0) + 1
+            self._retry_at.pop(table, None)  # A fresh write is worth a fetch even right after a failure.
+
+    def start(self):
+        """Starts the background version check (once per process; a forked process starts its own)."""
+        if self._thread is not None and self._pid == os.getpid(): return
+        self._pid = os.getpid()
+        def loop():
+            while True:
+                try: self.check()  # Immediately first: the copy loaded from disk may be days old.
+                except Exception: pass
+                time.sleep(self.refresh_interval)
+        self._thread = threading.Thread(target=loop, name="takeon-replica", daemon=True)
+        self._thread.start()
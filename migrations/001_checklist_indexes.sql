@@ -0,0 +1,11 @@
+-- Indexes for the Checklist access patterns used by database.py / app.py.
+-- "id" is the primary key, so updates by id are already indexed.
+
+-- Per-complex reads and initialize_checklist's delete by "Complex Name".
+CREATE INDEX IF NOT EXISTS checklist_complex_name_idx
+    ON "Checklist" ("Complex Name");
+
+-- Pending items for a complex (Received = false AND Delete = false).
+CREATE INDEX IF NOT EXISTS checklist_complex_pending_idx
+    ON "Checklist" ("Complex Name")
+    WHERE "Received" IS NOT TRUE AND "Delete" IS NOT TRUE;
@@ -0,0 +1,7 @@
+-- Duplicate buildings are rejected by the database instead of a select("*") pre-check.
+-- create_new_building maps the resulting unique violation (23505) to "EXISTS".
+--
+-- Fails if duplicates already exist; find them first with:
+--   SELECT "Complex Name", count(*) FROM "Projects" GROUP BY 1 HAVING count(*) > 1;
+ALTER TABLE "Projects"
+    ADD CONSTRAINT projects_complex_name_key UNIQUE ("Complex Name");
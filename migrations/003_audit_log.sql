@@ -0,0 +1,19 @@
+-- Audit trail written in batches by database.audit (audit_log.AuditLog).
+-- One row per event: logins, checklist initialisation, inserts, and one row per changed field on saves.
+-- New logins are recorded here (event = 'login') instead of "LoginLogs".
+CREATE TABLE IF NOT EXISTS "AuditLog" (
+    id bigserial PRIMARY KEY,
+    created_at timestamptz NOT NULL DEFAULT now(),
+    event text NOT NULL,
+    user_email text,
+    table_name text,
+    row_id text,
+    complex_name text,
+    field text,
+    old_value text,
+    new_value text
+);
+
+CREATE INDEX IF NOT EXISTS auditlog_table_row_idx ON "AuditLog" (table_name, row_id, created_at);
+CREATE INDEX IF NOT EXISTS auditlog_complex_idx ON "AuditLog" (complex_name, created_at);
+CREATE INDEX IF NOT EXISTS auditlog_user_idx ON "AuditLog" (user_email, created_at);
@@ -0,0 +1,17 @@
+-- Per-complex indexes for the sub-tables (Employees, Arrears, Council), which are read and attached per complex too.
+-- Kept apart from 001 because these tables exist with either "Complex Name" or complex_name columns (and a lowercase
+-- council table): only the tables and columns actually present are indexed, so the script never aborts.
+DO $$
+DECLARE
+    t text;
+    c text;
+BEGIN
+    FOR t, c IN
+        SELECT table_name, column_name FROM information_schema.columns
+        WHERE table_schema = current_schema()
+          AND table_name IN ('Employees', 'Arrears', 'Council', 'council')
+          AND column_name IN ('Complex Name', 'complex_name')
+    LOOP
+        EXECUTE format('CREATE INDEX IF NOT EXISTS %I ON %I (%I)', lower(t) || '_complex_name_idx', t, c);
+    END LOOP;
+END $$;
@@ -0,0 +1,22 @@
+-- Version stamp for the tables the app keeps in its local replica (local_replica.py): Projects, Settings, Master.
+-- Every insert and update sets updated_at, so database._probe_version (row count + latest updated_at) also
+-- notices in-place edits such as a new Agent Email or sent date; deletes change the row count.
+CREATE OR REPLACE FUNCTION takeon_touch_updated_at() RETURNS trigger AS $$
+BEGIN
+    NEW.updated_at = clock_timestamp();
+    RETURN NEW;
+END $$ LANGUAGE plpgsql;
+
+ALTER TABLE "Projects" ADD COLUMN IF NOT EXISTS updated_at timestamptz NOT NULL DEFAULT clock_timestamp();
+ALTER TABLE "Settings" ADD COLUMN IF NOT EXISTS updated_at timestamptz NOT NULL DEFAULT clock_timestamp();
+ALTER TABLE "Master" ADD COLUMN IF NOT EXISTS updated_at timestamptz NOT NULL DEFAULT clock_timestamp();
+
+DROP TRIGGER IF EXISTS projects_touch_updated_at ON "Projects";
+CREATE TRIGGER projects_touch_updated_at BEFORE INSERT OR UPDATE ON "Projects"
+    FOR EACH ROW EXECUTE FUNCTION takeon_touch_updated_at();
+DROP TRIGGER IF EXISTS settings_touch_updated_at ON "Settings";
+CREATE TRIGGER settings_touch_updated_at BEFORE INSERT OR UPDATE ON "Settings"
+    FOR EACH ROW EXECUTE FUNCTION takeon_touch_updated_at();
+DROP TRIGGER IF EXISTS master_touch_updated_at ON "Master";
+CREATE TRIGGER master_touch_updated_at BEFORE INSERT OR UPDATE ON "Master"
+    FOR EACH ROW EXECUTE FUNCTION takeon_touch_updated_at();
@@ -1,13 +1,28 @@
+import os
+import tempfile
 from fpdf import FPDF
 from datetime import datetime
-import os
 from utils import clean_text
+from pdf_templates import StaticBlock, draw_logo, clean, clean_column, table_header, table_rows
 
 def add_logo_to_pdf(pdf):
-    if os.path.exists("pretor_logo.png"):
-        pdf.image("pretor_logo.png", 10, 8, 40)
+    if draw_logo(pdf, 10, 8, 40):
         pdf.ln(15)
 
+# --- STATIC BLOCKS (identical in every document) ---
+PREFERRED_ORDER = ["Take-On", "Financial", "Legal", "Statutory Compliance", "Building Compliance", "Insurance", "City Council", "Employee", "General"]
+REQUIRED_HEADING = StaticBlock([("Arial", 'B', 10, 8, "REQUIRED DOCUMENTATION:")])
+BANKING_BLOCK = StaticBlock([
+    ("Arial", 'B', 10, 8, "BANKING DETAILS FOR TRANSFER OF FUNDS:"),
+    ("Arial", '', 9, 5, "Account Name: Pretor Group (Pty) Ltd\nBank: First National Bank\nBranch: Pretoria (251445)\nAccount Number: 514 242 794 08"),
+])
+SIGN_OFF = StaticBlock([
+    ("Arial", '', 9, 5, "Your co-operation regarding the above will be appreciated.\nYours faithfully,"),
+    ("Arial", 'B', 10, 5, "PRETOR GROUP"),
+])
+REPORT_COLUMNS, REPORT_WIDTHS = ["Item", "Status", "Action By", "Notes"], [80, 30, 40, 40]
+WEEKLY_COLUMNS, WEEKLY_WIDTHS = ["Complex Name", "Manager", "Status", "Prog.", "Pending Items"], [60, 40, 30, 20, 40]
+
 def generate_appointment_pdf(building_name, request_df, agent_name, take_on_date, year_end, building_code):
     pdf = FPDF()
     pdf.add_page()
@@ -22,42 +37,31 @@ def generate_appointment_pdf(building_name, request_df, agent_name, take_on_date
              f"{building_name} available for collection by us.")
     pdf.multi_cell(0, 5, clean_text(intro))
     pdf.ln(5)
-    pdf.set_font("Arial", 'B', 10)
-    pdf.cell(0, 8, "REQUIRED DOCUMENTATION:", ln=1)
+    REQUIRED_HEADING.draw(pdf)
     pdf.set_font("Arial", size=9)
-    
-    preferred_order = ["Take-On", "Financial", "Legal", "Statutory Compliance", "Building Compliance", "Insurance", "City Council", "Employee", "General"]
-    
-    if 'Task Heading' in request_df.columns:
-        unique_headings = request_df['Task Heading'].unique().tolist()
-        unique_headings.sort(key=lambda x: preferred_order.index(x) if x in preferred_order else 99)
-        for heading in unique_headings:
+
+    # One pass over pre-sanitised columns instead of a mask + iterrows per heading.
+    names = clean_column(request_df['Task Name'])
+    has_heads = 'Task Heading' in request_df.columns
+    heads = request_df['Task Heading'].tolist() if has_heads else [None] * len(names)
+    groups = {}
+    for heading, name in zip(heads, names): groups.setdefault(heading, []).append(name)
+    for heading in sorted(groups, key=lambda x: PREFERRED_ORDER.index(x) if x in PREFERRED_ORDER else 99):
+        if has_heads:
             if not heading: continue
             pdf.set_font("Arial", 'B', 9)
             pdf.ln(2)
-            pdf.cell(0, 6, clean_text(str(heading).upper()), ln=1)
+            pdf.cell(0, 6, clean(str(heading).upper()), ln=1)
             pdf.set_font("Arial", size=9)
-            section_items = request_df[request_df['Task Heading'] == heading]
-            for _, row in section_items.iterrows():
-                pdf.cell(5, 5, "-", ln=0)
-                pdf.multi_cell(0, 5, clean_text(str(row['Task Name'])))
-    else:
-        for _, row in request_df.iterrows():
+        for name in groups[heading]:
             pdf.cell(5, 5, "-", ln=0)
-            pdf.multi_cell(0, 5, clean_text(str(row['Task Name'])))
-            
+            pdf.multi_cell(0, 5, name)
+
     pdf.ln(5)
-    pdf.set_font("Arial", 'B', 10)
-    pdf.cell(0, 8, "BANKING DETAILS FOR TRANSFER OF FUNDS:", ln=1)
-    pdf.set_font("Arial", size=9)
-    banking_info = (f"Account Name: Pretor Group (Pty) Ltd\nBank: First National Bank\nBranch: Pretoria (251445)\n"
-                    f"Account Number: 514 242 794 08\nReference: S{building_code}12005X")
-    pdf.multi_cell(0, 5, clean_text(banking_info))
+    BANKING_BLOCK.draw(pdf)
+    pdf.cell(0, 5, clean(f"Reference: S{building_code}12005X"), ln=1)
     pdf.ln(5)
-    pdf.cell(0, 5, "Your co-operation regarding the above will be appreciated.", ln=1)
-    pdf.cell(0, 5, "Yours faithfully,", ln=1)
-    pdf.set_font("Arial", 'B', 10)
-    pdf.cell(0, 5, "PRETOR GROUP", ln=1)
+    SIGN_OFF.draw(pdf)
     filename = clean_text(f"{building_name}_Handover_Request.pdf")
     pdf.output(filename)
     return filename
@@ -71,20 +75,10 @@ def generate_report_pdf(building_name, items_df, providers_df, title):
     pdf.ln(10)
     pdf.set_font("Arial", 'B', 12)
     pdf.cell(0, 10, "1. Take-On Checklist", ln=1)
-    pdf.set_font("Arial", 'B', 10)
-    pdf.cell(80, 10, "Item", 1)
-    pdf.cell(30, 10, "Status", 1)
-    pdf.cell(40, 10, "Action By", 1)
-    pdf.cell(40, 10, "Notes", 1)
-    pdf.ln()
-    pdf.set_font("Arial", size=9)
-    for _, row in items_df.iterrows():
-        status = "Received" if row['Received'] else "Pending"
-        pdf.cell(80, 10, clean_text(str(row['Task Name'])[:40]), 1)
-        pdf.cell(30, 10, status, 1)
-        pdf.cell(40, 10, clean_text(str(row['Responsibility'])[:20]), 1)
-        pdf.cell(40, 10, clean_text(str(row['Notes'])[:20]), 1)
-        pdf.ln()
+    table_header(pdf, REPORT_COLUMNS, REPORT_WIDTHS)
+    status = ["Received" if r else "Pending" for r in items_df['Received']]
+    table_rows(pdf, [clean_column(items_df['Task Name'], 40), status, clean_column(items_df['Responsibility'], 20),
+                     clean_column(items_df['Notes'], 20)], REPORT_WIDTHS)
     filename = clean_text(f"{building_name}_Report.pdf")
     pdf.output(filename)
     return filename
@@ -96,21 +90,89 @@ def generate_weekly_report_pdf(summary_list):
     pdf.set_font("Arial", 'B', 16)
     pdf.cell(0, 10, txt="Weekly Take-On Overview", ln=1, align='C')
     pdf.ln(10)
-    pdf.set_font("Arial", 'B', 10)
-    pdf.cell(60, 10, "Complex Name", 1)
-    pdf.cell(40, 10, "Manager", 1)
-    pdf.cell(30, 10, "Status", 1)
-    pdf.cell(20, 10, "Prog.", 1)
-    pdf.cell(40, 10, "Pending Items", 1)
-    pdf.ln()
-    pdf.set_font("Arial", size=9)
-    for item in summary_list:
-        pdf.cell(60, 10, clean_text(str(item['Complex Name'])[:25]), 1)
-        pdf.cell(40, 10, clean_text(str(item['Manager'])[:18]), 1)
-        pdf.cell(30, 10, clean_text(item['Status'])[:15], 1)
-        pdf.cell(20, 10, f"{int(item['Progress']*100)}%", 1)
-        pdf.cell(40, 10, str(item['Items Pending']), 1)
-        pdf.ln()
+    table_header(pdf, WEEKLY_COLUMNS, WEEKLY_WIDTHS)
+    table_rows(pdf, [clean_column([i['Complex Name'] for i in summary_list], 25), clean_column([i['Manager'] for i in summary_list], 18),
+                     clean_column([i['Status'] for i in summary_list], 15), [f"{int(i['Progress']*100)}%" for i in summary_list],
+                     [str(i['Items Pending']) for i in summary_list]], WEEKLY_WIDTHS)
     filename = f"Weekly_Report_{datetime.now().strftime('%Y%m%d')}.pdf"
     pdf.output(filename)
     return filename
+
+# --- BUILDING PDFS (agent request and client report; shared by app.py and worker.py) ---
+class BasePDF(FPDF):
+    def clean_text(self, text):
+        return "" if text is None else clean(str(text))
+    def header(self):
+        draw_logo(self, 10, 8, 33)  # Logo checked and parsed once per process.
+        self.set_font('Arial', 'B', 14); self.cell(80); self.ln(20)
+    def footer(self):
+        self.set_y(-15); self.set_font('Arial', 'I', 8); self.cell(0, 10, f'Page {self.page_no()}', 0, 0, 'C')
+
+# --- 1. AGENT REQUEST PDF ---
+class AgentRequestPDF(BasePDF):
+    def section_header(self, title):
+        self.set_font('Arial', 'B', 11); self.set_fill_color(230, 230, 230); self.cell(0, 8, self.clean_text(title), 0, 1, 'L', 1); self.ln(2)
+    def add_item(self, text):
+        self.set_font('Arial', '', 10); self.cell(10); self.multi_cell(0, 5, "- " + self.clean_text(text)); self.ln(1)
+
+IMMEDIATE_NOTE = StaticBlock([('Arial', 'I', 9, 5, "Please provide the following documents at your earliest convenience.")])
+MONTH_END_NOTE = StaticBlock([('Arial', 'I', 9, 5, "Please provide the following records once the month has been closed (by the 10th).")])
+
+def generate_agent_request_pdf(complex_name, checklist_df, agent_name, take_on_date, immediate_items_list):
+    pdf = AgentRequestPDF()
+    pdf.add_page()
+    pdf.set_font('Arial', 'B', 14); pdf.cell(0, 10, 'Handover Request: Managing Agent Appointment', 0, 1, 'C'); pdf.ln(5)
+    pdf.set_font('Arial', '', 10)
+    intro = f"Dear {agent_name},\n\nWe confirm that Pretor Group has been appointed as the managing agents for {complex_name}, effective {take_on_date}.\n\nTo ensure a smooth transition, we require the following documentation. We have separated this request into items required immediately and items required at month-end closing."
+    pdf.multi_cell(0, 5, pdf.clean_text(intro)); pdf.ln(5)
+    
+    # Split Dataframe
+    df_immediate = checklist_df[checklist_df['Task Name'].isin(immediate_items_list)]
+    df_month_end = checklist_df[~checklist_df['Task Name'].isin(immediate_items_list)]
+    
+    pdf.section_header("SECTION A: REQUIRED IMMEDIATELY")
+    IMMEDIATE_NOTE.draw(pdf); pdf.ln(2)
+    if not df_immediate.empty:
+        for heading, group in df_immediate.groupby('Task Heading', observed=True):
+            pdf.set_font('Arial', 'B', 9); pdf.cell(0, 6, pdf.clean_text(heading), 0, 1)
+            for name in clean_column(group['Task Name']): pdf.add_item(name)
+            pdf.ln(2)
+    else: pdf.add_item("No immediate items listed.")
+    pdf.ln(5)
+
+    pdf.section_header("SECTION B: REQUIRED BY MONTH END")
+    MONTH_END_NOTE.draw(pdf); pdf.ln(2)
+    if not df_month_end.empty:
+        for heading, group in df_month_end.groupby('Task Heading', observed=True):
+            pdf.set_font('Arial', 'B', 9); pdf.cell(0, 6, pdf.clean_text(heading), 0, 1)
+            for name in clean_column(group['Task Name']): pdf.add_item(name)
+            pdf.ln(2)
+    else: pdf.add_item("No month-end items listed.")
+    
+    pdf.ln(5); pdf.set_font('Arial', 'B', 10); pdf.cell(0, 10, "We look forward to working with you during this handover.", 0, 1)
+    temp_dir = tempfile.gettempdir(); filename = os.path.join(temp_dir, f"Agent_Request_{complex_name}.pdf"); pdf.output(filename); return filename
+
+# --- 2. CLIENT REPORT PDF ---
+class ClientReport(BasePDF):
+    def section_title(self, label):
+        self.set_font('Arial', 'B', 12); self.set_fill_color(200, 220, 255); self.cell(0, 8, self.clean_text(label), 0, 1, 'L', 1); self.ln(2)
+    def entry_row(self, label, value):
+        self.set_font('Arial', 'B', 9); self.cell(55, 5, self.clean_text(label), 0); self.set_font('Arial', '', 9); self.multi_cell(0, 5, self.clean_text(str(value)))
+
+def create_comprehensive_pdf(complex_name, p_row, checklist_df, emp_df, arrears_df, council_df):
+    pdf = ClientReport(); pdf.add_page()
+    pdf.cell(80); pdf.cell(30, 10, 'Comprehensive Handover Report', 0, 0, 'C'); pdf.ln(20)
+    
+    pdf.section_title(f"1. Overview: {complex_name}"); pdf.ln(2)
+    fields = {"Building Code":"Building Code","Type":"Type","Units":"No of Units","Year End":"Year End","Address":"Physical Address","Manager":"Assigned Manager","Email":"Manager Email"}
+    for k,v in fields.items(): pdf.entry_row(k, p_row.get(v,''))
+    pdf.ln(5)
+    
+    pdf.section_title("2. Pending Items"); pdf.ln(2)
+    pending = checklist_df[~checklist_df['Received'] & ~checklist_df['Delete']]
+    if not pending.empty:
+        timings = clean_column(pending['Timing']) if 'Timing' in pending.columns else ['Unknown'] * len(pending)
+        for name, timing in zip(clean_column(pending['Task Name']), timings): pdf.cell(5); pdf.multi_cell(0, 5, f"- {name} ({timing})")
+    else: pdf.cell(0, 6, "No pending items.", 0, 1)
+    
+    temp_dir = tempfile.gettempdir(); filename = os.path.join(temp_dir, f"Report_{complex_name}.pdf"); pdf.output(filename); return filename
@@ -0,0 +1,89 @@
+import os
+import threading
+from functools import lru_cache
+import fpdf
+from fpdf import FPDF
+from utils import clean_text
+
+LOGO_PATH = "pretor_logo.png"
+# Reusing a parsed logo relies on PyFPDF 1.7 internals (FPDF._parsepng and the pdf.images dict).
+# fpdf2 also imports as `fpdf` but stores images differently, so there the logo goes through plain pdf.image().
+_REUSE_PARSED_LOGO = str(getattr(fpdf, "FPDF_VERSION", "")).startswith("1.") and hasattr(FPDF, "_parsepng")
+
+# --- RESOURCES (loaded once per process) ---
+@lru_cache(maxsize=None)
+def logo_path():
+    """The logo path if the file exists (checked once, not on every page)."""
+    return LOGO_PATH if os.path.exists(LOGO_PATH) else None
+
+@lru_cache(maxsize=None)
+def _logo_info():
+    """Parsed logo (decoded pixels + alpha mask). PNG parsing is the slowest part of a short document."""
+    return FPDF()._parsepng(logo_path())
+
+def draw_logo(pdf, x, y, w):
+    """Places the logo, reusing the process-wide parse. Each document gets its own copy (fpdf drops 'data' on output)."""
+    path = logo_path()
+    if path is None: return False
+    images = getattr(pdf, "images", None) if _REUSE_PARSED_LOGO else None
+    if isinstance(images, dict) and path not in images:
+        try: images[path] = dict(_logo_info(), i=len(images) + 1)
+        except Exception: pass  # Unparseable here: let fpdf report it from image() below.
+    pdf.image(path, x, y, w)
+    return True
+
+@lru_cache(maxsize=8192)
+def clean(text, max_len=None):
+    """clean_text for PDF output, memoised: headings, statuses and task names repeat across rows and documents."""
+    text = clean_text(text)
+    return text[:max_len] if max_len else text
+
+def clean_column(values, max_len=None):
+    """Pre-sanitised column (list of latin-1 strings) for table_rows."""
+    return [clean("" if v is None else str(v), max_len) for v in values]
+
+# --- STATIC BLOCKS (wrapped once, replayed as plain cells) ---
+_measure = FPDF()
+_measure_lock = threading.Lock()
+
+@lru_cache(maxsize=1024)
+def _wrap(text, family, style, size, width):
+    """Line breaks multi_cell would produce for text in a width (mm), computed once per text/font."""
+    with _measure_lock:
+        _measure.set_font(family, style, size)
+        lines = []
+        for para in text.split("\n"):
+            line = ""
+            for word in para.split(" "):
+                trial = f"{line} {word}" if line else word
+                if line and _measure.get_string_width(trial) > width - 2 * _measure.c_margin: lines.append(line); line = word
+                else: line = trial
+            lines.append(line)
+        return tuple(lines)
+
+class StaticBlock:
+    """
+    Fixed text (letterhead lines, intro boilerplate, banking details, sign-off) with its fonts.
+    parts: [(family, style, size, line_height, text)]. Text is cleaned and wrapped on first draw, then reused.
+    """
+    def __init__(self, parts, width=190):
+        self.parts = [(f, s, z, h, clean(t)) for f, s, z, h, t in parts]
+        self.width = width
+
+    def draw(self, pdf):
+        for family, style, size, h, text in self.parts:
+            pdf.set_font(family, style, size)
+            for line in _wrap(text, family, style, size, self.width): pdf.cell(0, h, line, 0, 1)
+
+def table_header(pdf, headers, widths, h=10, style='B', size=10, fill=None):
+    pdf.set_font('Arial', style, size)
+    if fill: pdf.set_fill_color(*fill)
+    for text, w in zip(headers, widths): pdf.cell(w, h, text, 1, 0, 'L', 1 if fill else 0)
+    pdf.ln()
+
+def table_rows(pdf, columns, widths, h=10, size=9):
+    """Lays out rows from pre-sanitised column lists (see clean_column); no per-row cleaning or lookups."""
+    pdf.set_font('Arial', '', size)
+    for row in zip(*columns):
+        for text, w in zip(row, widths): pdf.cell(w, h, text, 1)
+        pdf.ln()
@@ -0,0 +1,148 @@
+import re
+import math
+import bisect
+import pandas as pd
+from collections import defaultdict
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = {"a", "an", "and", "are", "did", "for", "in", "is", "my", "note", "noted", "of", "on", "or",
+             "our", "still", "the", "their", "to", "we", "what", "where", "which", "who"}
+
+# Field -> weight. Matches in the task name count most, headings least.
+FIELD_WEIGHTS = {"Task Name": 3.0, "Notes": 2.0, "Task Heading": 1.0, "Heading": 1.0, "Category": 0.5}
+MASTER_GROUP = "Master Schedule"
+# Everything _add / _doc read from a row: a reloaded row is re-indexed only if one of these changed.
+SIGNATURE_FIELDS = tuple(FIELD_WEIGHTS) + ("Complex Name", "Received", "Delete")
+
+def _blank(value):
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+def tokenize(text):
+    if _blank(text): return []
+    return [t for t in TOKEN_RE.findall(str(text).lower()) if t not in STOPWORDS]
+
+class SearchIndex:
+    """
+    In-process inverted index over checklist items and Master tasks.
+    Sources ('Checklist', 'Master') are loaded when their load token changes: whole (load_source), or by diffing
+    the reloaded rows against per-id signatures (sync_source). Saves are patched row by row, so searches never rescan the tables.
+    """
+    def __init__(self):
+        self.postings = defaultdict(dict)   # term -> {doc_id: weighted term frequency}
+        self.docs = {}                      # doc_id -> display fields
+        self.doc_terms = {}                 # doc_id -> terms (for removal)
+        self.tokens = {}                    # source -> load token
+        self.signatures = {}                # source -> {id: hash of SIGNATURE_FIELDS} (sync_source)
+        self._vocab = None                  # sorted terms, built lazily for prefix matching
+
+    # --- BUILD ---
+    def _add(self, doc_id, doc, row):
+        weights = defaultdict(float)
+        for field, w in FIELD_WEIGHTS.items():
+            for term in tokenize(row.get(field)): weights[term] += w
+        if not weights: return
+        for term, w in weights.items(): self.postings[term][doc_id] = w
+        self.docs[doc_id] = doc
+        self.doc_terms[doc_id] = list(weights)
+        self._vocab = None
+
+    def _remove(self, doc_id):
+        for term in self.doc_terms.pop(doc_id, []):
+            docs = self.postings.get(term)
+            if docs is None: continue
+            docs.pop(doc_id, None)
+            if not docs: del self.postings[term]; self._vocab = None
+        self.docs.pop(doc_id, None)
+
+    def _doc(self, source, row):
+        done = str(row.get("Received")).lower() == "true" or str(row.get("Delete")).lower() == "true"
+        complex_name = row.get("Complex Name") if source == "Checklist" else None
+        return {"source": source, "id": row.get("id"), "complex": str(complex_name) if complex_name is not None else MASTER_GROUP,
+                "task": str(row.get("Task Name") or ""), "heading": str(row.get("Task Heading") or row.get("Heading") or ""),
+                "notes": "" if _blank(row.get("Notes")) else str(row.get("Notes")), "done": done}
+
+    def load_source(self, source, df, token):
+        """Rebuilds one source from a frame unless it was already built from the same load (token)."""
+        if self.tokens.get(source) == token and token is not None: return
+        for doc_id in [d for d in self.docs if d[0] == source]: self._remove(doc_id)
+        if not df.empty:
+            for i, row in enumerate(df.to_dict("records")):
+                self._add((source, row.get("id", i)), self._doc(source, row), row)
+        self.tokens[source] = token
+        self.signatures.pop(source, None)
+
+    def sync_source(self, source, df, token):
+        """
+        Brings a source up to date with a reloaded frame by id: rows whose indexed fields changed are re-indexed,
+        rows that are gone are removed, the rest are left alone. Falls back to load_source for frames without ids.
+        """
+        if self.tokens.get(source) == token and token is not None: return
+        if df.empty or "id" not in df.columns: return self.load_source(source, df, token)
+        cols = [c for c in SIGNATURE_FIELDS if c in df.columns]
+        sigs = dict(zip(df["id"].tolist(), pd.util.hash_pandas_object(df[cols], index=False).tolist()))
+        old = self.signatures.get(source)
+        if old is None:  # First sync (or after load_source): start from an empty source.
+            for doc_id in [d for d in self.docs if d[0] == source]: self._remove(doc_id)
+            old = {}
+        for rid in old.keys() - sigs.keys(): self._remove((source, rid))
+        changed = [rid for rid, h in sigs.items() if old.get(rid) != h]
+        if changed: self.update_rows(source, df[df["id"].isin(changed)])
+        self.signatures[source] = sigs
+        self.tokens[source] = token
+
+    def update_rows(self, source, df):
+        """Re-indexes changed rows (by id) after a save."""
+        for row in df.to_dict("records"):
+            doc_id = (source, row.get("id"))
+            self._remove(doc_id)
+            self._add(doc_id, self._doc(source, row), row)
+
+    # --- QUERY ---
+    def _expand(self, term):
+        """Exact term, or every indexed term it prefixes (the last query word may be half-typed)."""
+        if self._vocab is None: self._vocab = sorted(self.postings)
+        i = bisect.bisect_left(self._vocab, term)
+        out = []
+        while i < len(self._vocab) and self._vocab[i].startswith(term):
+            out.append(self._vocab[i]); i += 1
+        return out
+
+    def search(self, query, page=1, per_page=10, pending_only=False):
+        """
+        Ranked search grouped by complex. Every indexed query word must match (the last one as a prefix).
+        Groups are ordered by their best hit and paginated; returns {total_hits, total_groups, pages, page, groups}.
+        """
+        terms = tokenize(query)
+        empty = {"total_hits": 0, "total_groups": 0, "pages": 0, "page": 1, "groups": []}
+        if not terms: return empty
+        n_docs = max(len(self.docs), 1)
+        # Postings per query word; the rarest word seeds the candidates, the rest only filter them.
+        # Words that appear nowhere in the index ("buildings", "missing") are ignored rather than failing the query.
+        per_term = []
+        for pos, term in enumerate(terms):
+            matched = self._expand(term) if pos == len(terms) - 1 else ([term] if term in self.postings else [])
+            if not matched: continue
+            per_term.append([(self.postings[t], math.log(1 + n_docs / len(self.postings[t]))) for t in matched])
+        if not per_term: return empty
+        per_term.sort(key=lambda lists: sum(len(docs) for docs, _ in lists))
+        scores = defaultdict(float)
+        for docs, idf in per_term[0]:
+            for doc_id, w in docs.items(): scores[doc_id] += w * idf
+        for lists in per_term[1:]:
+            narrowed = {}
+            for doc_id, s in scores.items():
+                hit = sum(docs[doc_id] * idf for docs, idf in lists if doc_id in docs)
+                if hit: narrowed[doc_id] = s + hit
+            scores = narrowed
+            if not scores: return empty
+
+        groups = defaultdict(list)
+        for doc_id, score in scores.items():
+            doc = self.docs[doc_id]
+            if pending_only and doc["done"]: continue
+            groups[doc["complex"]].append(dict(doc, score=round(score, 3)))
+        ranked = sorted(groups.items(), key=lambda g: (-max(h["score"] for h in g[1]), g[0]))
+        pages = max(1, math.ceil(len(ranked) / per_page))
+        page = min(max(1, page), pages)
+        out = [{"complex": name, "hits": sorted(hits, key=lambda h: -h["score"])} for name, hits in ranked[(page - 1) * per_page: page * per_page]]
+        return {"total_hits": sum(len(h) for h in groups.values()), "total_groups": len(ranked), "pages": pages, "page": page, "groups": out}
@@ -0,0 +1,130 @@
+import os
+import json
+import time
+import uuid
+import queue
+import threading
+
+class SharedCache:
+    """
+    Cross-process cache of table reads on a Redis-protocol server, keyed by table + query.
+    1. Each table has a version counter; cached keys include it, so a write makes every replica miss at once.
+    2. Writes are also published on '<prefix>:invalidate' so other processes drop their in-memory copies.
+    3. If the server is unreachable, reads fall through to the loader (the app keeps working uncached).
+    """
+    def __init__(self, client, subscriber=None, ttl=300, prefix="takeon"):
+        self.client = client
+        self.subscriber = subscriber or client
+        self.ttl = ttl
+        self.prefix = prefix
+        self.channel = f"{prefix}:invalidate"
+        self.origin = uuid.uuid4().hex   # Lets a process ignore its own broadcasts.
+        self._listeners = []
+        self._thread = None
+        self._pid = None
+
+    def _version(self, table):
+        v = self.client.get(f"{self.prefix}:ver:{table}")
+        return int(v) if v else 0
+
+    def fetch(self, table, query, loader):
+        """Returns the cached rows for (table, query), calling loader() and storing the result on a miss."""
+        try:
+            key = f"{self.prefix}:rows:{table}:{self._version(table)}:{query}"
+            hit = self.client.get(key)
+            if hit is not None: return json.loads(hit)
+        except Exception:
+            return loader()
+        rows = loader()
+        try: self.client.set(key, json.dumps(rows, default=str), ex=self.ttl)
+        except Exception: pass
+        return rows
+
+    def invalidate(self, table):
+        """Bumps the table version and tells the other processes."""
+        try:
+            self.client.incr(f"{self.prefix}:ver:{table}")
+            self.client.publish(self.channel, json.dumps({"table": table, "origin": self.origin}))
+        except Exception:
+            pass  # Entries still expire after ttl.
+
+    def on_invalidate(self, callback):
+        """Registers callback(table) for writes made by other processes."""
+        self._listeners.append(callback)
+
+    def start(self):
+        """Starts the pub/sub listener thread (once per process; a forked process starts its own)."""
+        if self._thread is not None and self._pid == os.getpid(): return
+        self._pid = os.getpid()
+        def listen():
+            while True:
+                try:
+                    pubsub = self.subscriber.pubsub(ignore_subscribe_messages=True)
+                    pubsub.subscribe(self.channel)
+                    for msg in pubsub.listen():
+                        if msg.get("type") != "message": continue
+                        event = json.loads(msg["data"])
+                        if event.get("origin") == self.origin: continue
+                        for callback in self._listeners: callback(event["table"])
+                except Exception:
+                    time.sleep(5)  # Dropped connection: resubscribe.
+        self._thread = threading.Thread(target=listen, name="takeon-shared-cache", daemon=True)
+        self._thread.start()
+
+# --- LOCAL STAND-IN ---
+class MemoryRedis:
+    """In-process stand-in for the part of the Redis API SharedCache uses (for local runs and tests)."""
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+        self._subscribers = []
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None: return None
+            value, expires = item
+            if expires and expires < time.time():
+                del self._data[key]; return None
+            return value
+
+    def set(self, key, value, ex=None):
+        with self._lock:
+            self._data[key] = (value.encode() if isinstance(value, str) else value, time.time() + ex if ex else None)
+        return True
+
+    def incr(self, key):
+        with self._lock:
+            value = int(self._data.get(key, (b"0", None))[0]) + 1
+            self._data[key] = (str(value).encode(), None)
+            return value
+
+    def publish(self, channel, message):
+        subs = [s for s in self._subscribers if channel in s.channels]
+        for s in subs: s._queue.put({"type": "message", "channel": channel.encode(), "data": message.encode()})
+        return len(subs)
+
+    def pubsub(self, ignore_subscribe_messages=True):
+        return _MemoryPubSub(self)
+
+class _MemoryPubSub:
+    def __init__(self, server):
+        self.server = server
+        self.channels = set()
+        self._queue = queue.Queue()
+
+    def subscribe(self, *channels):
+        self.channels.update(channels)
+        if self not in self.server._subscribers: self.server._subscribers.append(self)
+
+    def listen(self):
+        while True: yield self._queue.get()
+
+def connect(url, ttl=300):
+    """Builds a SharedCache for 'redis://...' / 'rediss://...' or 'memory://' (in-process stand-in)."""
+    if url.startswith("memory://"):
+        return SharedCache(MemoryRedis(), ttl=ttl)
+    import redis  # Optional dependency, only needed for multi-replica deployments.
+    client = redis.Redis.from_url(url, socket_timeout=2, socket_connect_timeout=2)
+    subscriber = redis.Redis.from_url(url, health_check_interval=30)
+    return SharedCache(client, subscriber=subscriber, ttl=ttl)
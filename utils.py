@@ -1,5 +1,7 @@
 import re
+from functools import lru_cache
 from datetime import datetime, timedelta
+import pandas as pd
 from dateutil.relativedelta import relativedelta
 
 def clean_text(text):
@@ -15,6 +17,23 @@ def clean_text(text):
         text = text.replace(char, repl)
     return text.encode('latin-1', 'replace').decode('latin-1')
 
+# --- VALIDATION PATTERNS (app.py's validate_* helpers and bulk_import's column checks) ---
+EMAIL_PATTERN = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
+PHONE_PATTERN = r'^0\d{9}$'          # After removing spaces, dashes and brackets.
+PHONE_STRIP = r'[\s\-\(\)]'
+SA_ID_PATTERN = r'^\d{13}$'
+
+MONTHS = {'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6, 
+          'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12}
+
+@lru_cache(maxsize=None)
+def year_end_month(year_end_str):
+    """Month number from a free-text Year End ('February', '28 Feb', ...). Defaults to February."""
+    text = str(year_end_str).lower()
+    for m_name, m_val in MONTHS.items():
+        if m_name in text: return m_val
+    return 2
+
 def calculate_financial_periods(take_on_date_str, year_end_str):
     """Calculates financial periods based on Take-On Date and Year End."""
     try:
@@ -22,13 +41,7 @@ def calculate_financial_periods(take_on_date_str, year_end_str):
         first_of_take_on = take_on_date.replace(day=1)
         request_end_date = first_of_take_on - timedelta(days=1) 
         
-        months = {'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6, 
-                  'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12}
-        ye_month = 2 
-        for m_name, m_val in months.items():
-            if m_name in str(year_end_str).lower():
-                ye_month = m_val
-                break
+        ye_month = year_end_month(year_end_str)
         
         start_month = ye_month + 1
         if start_month > 12: start_month = 1
@@ -57,3 +70,65 @@ def calculate_financial_periods(take_on_date_str, year_end_str):
         return current_period_str, historic_period_str, bank_str, owner_bal_str, closing_bal_str
     except Exception:
         return "Current Financial Year Records", "Past 5 Financial Years", "Latest Bank Statements", "Owner Balances", "Final Closing Balances"
+
+# --- DEADLINE ENGINE (whole portfolio at once) ---
+MONTH_END_HEADINGS = ['Financial', 'Employee', 'City Council']
+
+def _as_bool(col):
+    return col if col.dtype == bool else col.astype(str).str.lower() == 'true'
+
+def compute_project_deadlines(projects_df):
+    """
+    Vectorised calculate_financial_periods for every project:
+    Cut-Off Date (day before the take-on month), Financial Year Start, Bank Statement Date (take-on less a month)
+    and Closing Balance Due (take-on + 10 days). Unparseable take-on dates give NaT.
+    """
+    cols = ['Complex Name', 'Take On Date', 'Cut-Off Date', 'Financial Year Start', 'Bank Statement Date', 'Closing Balance Due']
+    if projects_df.empty or 'Take On Date' not in projects_df.columns: return pd.DataFrame(columns=cols)
+    out = pd.DataFrame({'Complex Name': projects_df['Complex Name'].astype(str).values})
+    take_on = pd.to_datetime(projects_df['Take On Date'], errors='coerce', format='%Y-%m-%d').reset_index(drop=True)
+    year_end = projects_df['Year End'] if 'Year End' in projects_df.columns else pd.Series('', index=projects_df.index)
+    ye_month = year_end.astype(str).map(year_end_month).reset_index(drop=True)  # Parsed once per distinct value.
+
+    cut_off = pd.to_datetime(take_on.values.astype('datetime64[M]')) - pd.Timedelta(days=1)
+    cut_off = pd.Series(cut_off)
+    start_month = ye_month % 12 + 1
+    start_year = cut_off.dt.year - (start_month > cut_off.dt.month).astype(int)
+    fy_start = pd.to_datetime(pd.DataFrame({'year': start_year, 'month': start_month, 'day': 1}), errors='coerce')
+
+    out['Take On Date'] = take_on
+    out['Cut-Off Date'] = cut_off
+    out['Financial Year Start'] = fy_start
+    out['Bank Statement Date'] = take_on - pd.DateOffset(months=1)
+    out['Closing Balance Due'] = take_on + pd.Timedelta(days=10)
+    return out[cols]
+
+def attach_due_dates(checklist_df, deadlines_df):
+    """Adds 'Due Date' to checklist rows: Month-End items are due with the closing balances, the rest on take-on."""
+    df = checklist_df.copy()
+    if df.empty: df['Due Date'] = pd.Series(dtype='datetime64[ns]'); return df
+    dl = deadlines_df.drop_duplicates('Complex Name').set_index('Complex Name')
+    keys = df['Complex Name'].astype(str)
+    timing = df['Timing'].astype(str).str.lower() if 'Timing' in df.columns else pd.Series('', index=df.index)
+    heading = df['Task Heading'].astype(str) if 'Task Heading' in df.columns else pd.Series('', index=df.index)
+    month_end = timing.str.contains('month', na=False) | (~timing.str.contains('immediate', na=False) & heading.isin(MONTH_END_HEADINGS))
+    take_on = keys.map(dl['Take On Date'])
+    closing = keys.map(dl['Closing Balance Due'])
+    df['Due Date'] = closing.where(month_end, take_on)
+    return df
+
+def overdue_queue(checklist_df, projects_df, today=None):
+    """
+    Portfolio-wide queue of pending checklist items past their due date, most overdue first.
+    Finalized projects are skipped.
+    """
+    cols = ['Complex Name', 'Task Heading', 'Task Name', 'Responsibility', 'Due Date', 'Days Overdue']
+    if checklist_df.empty or projects_df.empty: return pd.DataFrame(columns=cols)
+    today = pd.Timestamp(today or datetime.now().date())
+    active = projects_df[projects_df['Status'].astype(str) != 'Finalized'] if 'Status' in projects_df.columns else projects_df
+    chk = checklist_df[~_as_bool(checklist_df['Received']) & ~_as_bool(checklist_df['Delete'])]
+    chk = attach_due_dates(chk, compute_project_deadlines(active))
+    late = chk[chk['Due Date'] < today].copy()
+    late['Days Overdue'] = (today - late['Due Date']).dt.days
+    late = late.sort_values(['Days Overdue', 'Complex Name'], ascending=[False, True])
+    return late[[c for c in cols if c in late.columns]].reset_index(drop=True)
@@ -0,0 +1,115 @@
+"""
+Runs queued jobs (checklist loads, client reports, uploads) outside the Streamlit process.
+
+    python worker.py                  # one worker
+    python worker.py --processes 4    # several workers on the same queue
+
+Workers must see the same TAKEON_JOB_DB / TAKEON_CACHE_DIR and Supabase secrets as the app.
+When no worker is running, the app starts one itself (database.ensure_worker) with --parent set to its own pid.
+"""
+import os
+import time
+import socket
+import shutil
+import argparse
+import multiprocessing
+
+import database as db
+from pdf_generator import create_comprehensive_pdf
+
+# --- HANDLERS: job -> result (bytes / str). Raising marks the attempt failed (and retried). ---
+def run_initialize_checklist(job, progress):
+    p = job["payload"]
+    progress(0.05, "Copying Master schedule")
+    res = db.initialize_checklist(p["complex_name"], p["building_type"], progress=progress, user=p.get("user"))
+    if res != "SUCCESS": raise RuntimeError(res)
+    return res
+
+def run_client_report(job, progress):
+    name = job["payload"]["complex_name"]
+    progress(0.1, "Loading building data")
+    projs = db.get_data("Projects")
+    match = projs[projs['Complex Name'] == name] if not projs.empty else projs
+    if match.empty: raise RuntimeError(f"Unknown complex: {name}")
+    chk = db.get_complex_data("Checklist", name)
+    emp_df, arr_df, cou_df = db.get_data("Employees"), db.get_data("Arrears"), db.get_data("Council")
+    progress(0.5, "Rendering PDF")
+    pdf_f = create_comprehensive_pdf(name, match.iloc[0], chk, emp_df, arr_df, cou_df)
+    with open(pdf_f, "rb") as f: data = f.read()
+    if job["payload"].get("lock"): db.update_email_status(name, "Client Report Generated Date")
+    return data
+
+def run_upload(job, progress):
+    p = job["payload"]
+    progress(0.1, "Uploading")
+    url = db.upload_bytes_to_supabase(job["input"], p["path"], p.get("content_type") or "application/octet-stream")
+    if not url: raise RuntimeError("Upload failed")
+    if p.get("table") and p.get("row_id") is not None:
+        progress(0.8, "Linking document")
+        res = db.update_document_url(p["table"], p["row_id"], url, user=p.get("user"))
+        if res != "SUCCESS": raise RuntimeError(res)
+    return url
+
+def run_export(job, progress):
+    import exporter
+    p = job["payload"]
+    exports = os.path.join(db.cache_dir, "exports")
+    out_dir = os.path.join(exports, job["id"])
+    counts = exporter.export_portfolio(out_dir, p.get("format", "parquet"), p.get("tables") or exporter.EXPORT_TABLES,
+                                       p.get("partition", False), progress=lambda f, m: progress(0.9 * f, m))
+    progress(0.95, f"Zipping {sum(counts.values()):,} rows")
+    zip_path = exporter.zip_dir(out_dir, os.path.join(exports, f"takeon_export_{job['id'][:8]}.zip"))
+    shutil.rmtree(out_dir, ignore_errors=True)
+    return zip_path
+
+HANDLERS = {
+    "initialize_checklist": run_initialize_checklist,
+    "client_report": run_client_report,
+    "upload": run_upload,
+    "export": run_export,
+}
+
+# --- LOOP ---
+def work(poll_interval=1.0, parent=None):
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    # database starts these at import; each start() is a no-op unless this process doesn't have its thread yet.
+    if db.replica is not None: db.replica.start()
+    if db.shared_cache is not None: db.shared_cache.start()
+    db.audit.start()
+    last_beat = 0
+    while True:
+        if parent and os.getppid() != parent: return  # The app that started this worker has exited.
+        if time.time() - last_beat > 10: db.jobs.beat(worker_id); last_beat = time.time()
+        job = db.jobs.claim(worker_id)
+        if job is None: time.sleep(poll_interval); continue
+        progress = lambda fraction, message=None: db.jobs.progress(job["id"], worker_id, fraction, message)
+        try:
+            handler = HANDLERS.get(job["kind"])
+            if handler is None: raise RuntimeError(f"Unknown job kind: {job['kind']}")
+            db.jobs.complete(job["id"], worker_id, handler(job, progress))
+        except ImportError as e:  # A missing optional library: retrying won't install it.
+            db.jobs.fail(job["id"], worker_id, e, retry=False)
+        except Exception as e:
+            db.jobs.fail(job["id"], worker_id, e)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--poll", type=float, default=1.0, help="seconds between queue checks when idle")
+    parser.add_argument("--parent", type=int, help="exit when this process (the app that started the worker) exits")
+    args = parser.parse_args()
+
+    db.jobs.purge()
+    exports = os.path.join(db.cache_dir, "exports")
+    for f in (os.listdir(exports) if os.path.isdir(exports) else []):
+        path = os.path.join(exports, f)
+        if time.time() - os.path.getmtime(path) > 7 * 86400: shutil.rmtree(path, ignore_errors=True) if os.path.isdir(path) else os.remove(path)
+    if args.processes <= 1: return work(args.poll, args.parent)
+    # Spawn, not fork: each worker imports database afresh, so its replica, cache listener and audit threads are its own.
+    ctx = multiprocessing.get_context("spawn")
+    procs = [ctx.Process(target=work, args=(args.poll,), name=f"takeon-worker-{i}") for i in range(args.processes)]
+    for p in procs: p.start()
+    for p in procs: p.join()
+
+if __name__ == "__main__":
+    main()